@@ -0,0 +1,30 @@
+class FakeChannel:
+    """
+    A stand-in for a Discord text channel that collects embeds instead of sending them.
+
+    Args:
+        name (str): The name shown when the channel is logged.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.messages = []
+
+    def __str__(self):
+        return f"#{self.name}"
+
+    @property
+    def embeds(self):
+        return [embed for message in self.messages for embed in message]
+
+    async def send(self, content=None, embed=None, embeds=None):
+        self.messages.append([embed] if embed is not None else list(embeds or []))
+
+class FakeBot:
+    """
+    A stand-in for the Discord bot that records presence changes.
+    """
+    def __init__(self):
+        self.activities = []
+
+    async def change_presence(self, activity=None, status=None):
+        self.activities.append(activity)
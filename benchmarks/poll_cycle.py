@@ -0,0 +1,93 @@
+"""
+Times full poll cycles against recorded API responses, without network or Discord access.
+
+Record responses first by setting API_TRANSPORT = 'record' in config.py and letting the bot
+run its tasks once, then run from the repository root:
+
+    python -m benchmarks.poll_cycle --recordings recordings --latency 0.1 --runs 5
+
+The tasks run in a temporary working directory, so cursors.json, outbox.jsonl, events.db, games.json and the other
+state files of the bot are left untouched.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+import src.achievements as achievements
+import src.daily_overview as daily_overview
+import src.presence as presence
+from config.config import users, api_key, api_username
+from services import api
+from services.transport import ReplayTransport
+from services.distribution import distribution_cache
+from utils.cursor import CursorStore
+from utils.outbox import Outbox
+from benchmarks.fake_discord import FakeChannel, FakeBot
+
+async def no_color(*args, **kwargs) -> int:
+    return 0
+
+async def run_cycle(colors: bool) -> dict:
+    if not colors:
+        # Embed colors are fetched from image URLs, which needs network access
+        achievements.get_discord_color = daily_overview.get_discord_color = no_color
+    for state_file in ('cursors.json', 'outbox.jsonl'):
+        if os.path.exists(state_file):
+            os.remove(state_file)
+    achievements.cursors = CursorStore()  # A fresh cursor in the temporary directory, so every run polls the same window
+    achievements.outbox = Outbox()
+    api.response_cache.clear()
+    distribution_cache.clear()
+
+    achievements_channel, mastery_channel, daily_channel = FakeChannel('achievements'), FakeChannel('mastery'), FakeChannel('daily-overview')
+    bot = FakeBot()
+    timings = {}
+
+    start = time.perf_counter()
+    await achievements.process_achievements(users, api_username, api_key, achievements_channel, mastery_channel)
+    timings['achievements'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await daily_overview.process_daily_overview(users, api_username, api_key, daily_channel)
+    timings['daily_overview'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for user in users:
+        await presence.process_presence(bot, user, api_username, api_key)
+    timings['presence'] = time.perf_counter() - start
+
+    timings['embeds'] = len(achievements_channel.embeds) + len(mastery_channel.embeds) + len(daily_channel.embeds)
+    return timings
+
+async def main(args) -> None:
+    transport = ReplayTransport(os.path.abspath(args.recordings), args.latency)
+    api.set_transport(transport)
+    if args.rate:
+        api.rate_limiter.rate = api.rate_limiter.burst = args.rate
+
+    emoji_file = 'emoji.json' if os.path.exists('emoji.json') else 'emoji_example.json'
+    workdir = tempfile.mkdtemp(prefix='retrocord-bench-')
+    shutil.copy(emoji_file, os.path.join(workdir, 'emoji.json'))
+    os.chdir(workdir)
+    try:
+        for run in range(1, args.runs + 1):
+            transport.requests = 0
+            timings = await run_cycle(args.colors)
+            print(
+                f"run {run}: achievements {timings['achievements']:.3f}s, daily overview {timings['daily_overview']:.3f}s, "
+                f"presence {timings['presence']:.3f}s, {transport.requests} requests, {timings['embeds']} embeds"
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time poll cycles against recorded RetroAchievements responses.')
+    parser.add_argument('--recordings', default='recordings', help='Directory with the recorded responses')
+    parser.add_argument('--latency', type=float, default=0, help='Seconds each replayed response is delayed')
+    parser.add_argument('--runs', type=int, default=3, help='Number of cycles to run')
+    parser.add_argument('--rate', type=float, default=0, help='Override the requests per second of the rate limiter')
+    parser.add_argument('--colors', action='store_true', help='Fetch embed colors from image URLs, this needs network access for uncached images')
+    asyncio.run(main(parser.parse_args()))
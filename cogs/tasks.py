@@ -1,16 +1,22 @@
 import asyncio
 from discord.ext import tasks, commands
-from src.achievements import process_achievements
+from src.achievements import process_achievements, probe_idle_users, send_pending_embeds
 from src.daily_overview import process_daily_overview
 from src.presence import process_presence
+from services.api import close_session
+from services.dispatch import dispatcher
+from utils.scheduler import poll_scheduler
+from utils.jobs import job_runner
+from utils.emoji import emoji_registry
 from utils.datetime import delay_until_next_interval, delay_until_next_midnight
-from config.config import users, api_key, api_username, ACHIEVEMENTS_CHANNEL_ID, DAILY_OVERVIEW_CHANNEL_ID, MASTERY_CHANNEL_ID, RETROACHIEVEMENTS_INTERVAL, PRESENCE_INTERVAL, TASK_START_DELAY
+from config.config import users, api_key, api_username, ACHIEVEMENTS_CHANNEL_ID, DAILY_OVERVIEW_CHANNEL_ID, MASTERY_CHANNEL_ID, POLL_TICK, PRESENCE_INTERVAL, TASK_START_DELAY
 from utils.custom_logger import logger
 
 class TasksCog(commands.Cog):
     def __init__(self, bot: commands.Bot, start_delay: dict = None) -> None:
         self.bot = bot
         self.start_delay = start_delay or {}
+        emoji_registry.load()  # Load the console emoji once, they are reloaded when emoji.json changes
         self.process_achievements.start()  # Always start the task when the cog is loaded
         self.process_daily_overview.start()  # Always start the task when the cog is loaded
 
@@ -19,24 +25,42 @@ class TasksCog(commands.Cog):
         self.current_user_index = 0
         self.process_presence.start()
 
-    @tasks.loop(minutes=RETROACHIEVEMENTS_INTERVAL)
+    async def cog_unload(self):
+        self.process_achievements.cancel()
+        self.process_daily_overview.cancel()
+        self.process_presence.cancel()
+        await dispatcher.close()
+        await close_session()  # Close the shared API connection pool
+
+    @tasks.loop(seconds=POLL_TICK)
+    @job_runner.job('process_achievements', interval=POLL_TICK, priority=2)  # Achievements get the API first
     async def process_achievements(self):
+        if probe_users := poll_scheduler.due_probes():  # Idle users are not polled often, check their profiles for activity in between
+            await probe_idle_users(probe_users, api_username, api_key)
+        due_users = poll_scheduler.due_users()  # Every user has their own interval, only poll the ones that are due
+        if not due_users:
+            return
         achievements_channel = self.bot.get_channel(ACHIEVEMENTS_CHANNEL_ID)
         mastery_channel = self.bot.get_channel(MASTERY_CHANNEL_ID)
         try:
-            await process_achievements(users, api_username, api_key, achievements_channel, mastery_channel)
+            await process_achievements(due_users, api_username, api_key, achievements_channel, mastery_channel)
         except Exception as e:
             logger.error(f'Error processing achievements: {e}')
 
     @process_achievements.before_loop
     async def before_process_achievements(self):
         await self.bot.wait_until_ready()  # Wait until the bot has connected to the discord API
+        try:
+            await send_pending_embeds(self.bot.get_channel(ACHIEVEMENTS_CHANNEL_ID), self.bot.get_channel(MASTERY_CHANNEL_ID))  # Embeds that were not sent before the last shutdown
+        except Exception as e:
+            logger.error(f'Error sending pending embeds: {e}')
         if self.start_delay.get('process_achievements', False):  # Only delay the start of the task if its value in the start_delay dictionary is True
             delay = delay_until_next_interval('retro')  # Calculate the delay
             logger.info(f'Waiting {delay} seconds for Achievements task to start')
             await asyncio.sleep(delay)  # Wait for the specified delay
 
     @tasks.loop(hours=24)
+    @job_runner.job('process_daily_overview', interval=24 * 3600, priority=1)
     async def process_daily_overview(self):
         channel = self.bot.get_channel(DAILY_OVERVIEW_CHANNEL_ID)
         try:
@@ -53,6 +77,7 @@ class TasksCog(commands.Cog):
             await asyncio.sleep(delay)  # Wait for the specified delay
 
     @tasks.loop(minutes=PRESENCE_INTERVAL)
+    @job_runner.job('process_presence', interval=PRESENCE_INTERVAL * 60, priority=0)  # Waits while achievements are being polled
     async def process_presence(self):
         try:
             user = self.users[self.current_user_index]
@@ -13,7 +13,36 @@ ACHIEVEMENTS_CHANNEL_ID: The Discord channel ID to send achievement updates to
 DAILY_OVERVIEW_CHANNEL_ID: The Discord channel ID to send the daily RetroAchievements embed to
 MASTERY_CHANNEL_ID: The Discord channel ID to send the mastery updates to
 API_INTERVAL: The number of minutes to wait between Achievement requests, default is 15 minutes, minimum is 1 minute
+POLL_MAX_INTERVAL: The number of minutes to wait between Achievement requests for users that have been idle for a while, default is 60 minutes
+POLL_BACKOFF: The factor the Achievement interval of an idle user grows by after every poll without activity, default is 2
+POLL_PROBE_INTERVAL: The number of minutes between profile checks of users whose Achievement interval has grown past it, a changed rich presence or last game puts them back on API_INTERVAL, default is 15 minutes
+POLL_TICK: The number of seconds between checks for users whose Achievements are due, default is 60 seconds
 PRESENCE_INTERVAL: The number of minutes to wait between Presence requests, default is 120 minutes, minimum is 1 minute
+API_TIMEOUT: The number of seconds before a single RetroAchievements API request times out, default is 30 seconds
+ACHIEVEMENTS_CONCURRENCY: The maximum number of users whose achievements are fetched at the same time, default is 5
+USER_TIMEOUT: The number of seconds a single user may take before their achievements are skipped for that cycle, default is 120 seconds
+API_CACHE_MAX_ENTRIES: The maximum number of API responses kept in memory, default is 1000
+API_CACHE_MAX_BYTES: The maximum total size of the API responses kept in memory, default is 64 MB
+API_RATE_LIMIT: The maximum number of RetroAchievements API requests per second, default is 5
+API_RATE_BURST: The maximum number of API requests that can be made back to back, default is 10
+API_MAX_RETRIES: The number of times a throttled or failed API request is retried, default is 3
+API_CIRCUIT_THRESHOLD: The number of consecutive failed API requests before polling is paused, default is 10
+API_CIRCUIT_COOLDOWN: The number of seconds polling is paused after the API keeps failing, default is 300 seconds
+CURSOR_OVERLAP: The number of seconds each achievements poll overlaps the previous one, to catch unlocks the API reports late, default is 300 seconds
+CURSOR_MAX_CATCHUP_HOURS: The maximum number of hours of missed achievements that are posted after downtime, default is 24 hours
+API_TRANSPORT: How API requests are made, 'live' (default), 'record' to also save every response to API_RECORDINGS_DIR, or 'replay' to serve saved responses without network access
+API_RECORDINGS_DIR: The directory API responses are recorded to and replayed from
+API_REPLAY_LATENCY: The number of seconds every replayed response is delayed to simulate the live API, default is 0
+COLOR_CACHE_MAX_ENTRIES: The maximum number of image colors kept in image_cache.db, least recently used colors are evicted first, default is 5000
+COLOR_ENGINE: How embed colors are extracted from images, 'histogram' (default, fast) or 'kmeans' (needs scikit-learn)
+COLOR_WORKERS: The number of worker threads that download images and extract embed colors, default is 4
+COLOR_DEADLINE: The number of seconds an embed waits for its color before using the default color, default is 5 seconds
+DISCORD_RATE_LIMIT: The number of messages per second the bot sends to a single Discord channel, default is 1
+DISCORD_RATE_BURST: The maximum number of messages sent to a single Discord channel back to back, default is 5
+OUTBOX_MAX_ATTEMPTS: The number of times Discord may reject an embed before it is moved to outbox.dead.jsonl instead of being sent again, default is 3
+DISTRIBUTION_TTL: The number of seconds the unlock distribution of a mastered game is reused for mastery rarity, default is 3600 seconds
+TIMEZONE: The timezone used for displayed dates, the daily overview and weekly or monthly rollups, default is 'Europe/Amsterdam'
+TASK_BUDGET: A dictionary with the maximum number of seconds a single run of each task may take before it is cancelled, tasks that are missing are not limited
 TASK_START_DELAY: A dictionary to specify if the tasks should start immediately or wait until the next 15th minute, useful for debugging if set to False
 """
 
@@ -31,12 +60,47 @@ ACHIEVEMENTS_CHANNEL_ID = ""
 DAILY_OVERVIEW_CHANNEL_ID = ""
 MASTERY_CHANNEL_ID = ""
 RETROACHIEVEMENTS_INTERVAL = 5
+POLL_MAX_INTERVAL = 60
+POLL_BACKOFF = 2
+POLL_PROBE_INTERVAL = 15
+POLL_TICK = 60
 PRESENCE_INTERVAL = 120
 ACHIEVEMENT_EMBED_STYLE = 2
+API_TIMEOUT = 30
+ACHIEVEMENTS_CONCURRENCY = 5
+USER_TIMEOUT = 120
+API_CACHE_MAX_ENTRIES = 1000
+API_CACHE_MAX_BYTES = 64 * 1024 * 1024
+API_RATE_LIMIT = 5
+API_RATE_BURST = 10
+API_MAX_RETRIES = 3
+API_CIRCUIT_THRESHOLD = 10
+API_CIRCUIT_COOLDOWN = 300
+CURSOR_OVERLAP = 300
+CURSOR_MAX_CATCHUP_HOURS = 24
+API_TRANSPORT = 'live'
+API_RECORDINGS_DIR = 'recordings'
+API_REPLAY_LATENCY = 0
+COLOR_CACHE_MAX_ENTRIES = 5000
+COLOR_ENGINE = 'histogram'
+COLOR_WORKERS = 4
+COLOR_DEADLINE = 5
+DISCORD_RATE_LIMIT = 1
+DISCORD_RATE_BURST = 5
+OUTBOX_MAX_ATTEMPTS = 3
+TIMEZONE = 'Europe/Amsterdam'
+DISTRIBUTION_TTL = 3600
 
 # The delay before starting the tasks, useful for debugging, otherwise it will start within the first 15th minute
 TASK_START_DELAY = {
     'process_achievements': True,
     'process_daily_overview': True,
     'process_presence': True
-}
\ No newline at end of file
+}
+
+# The maximum number of seconds a single run of each task may take before it is cancelled
+TASK_BUDGET = {
+    'process_achievements': 600,
+    'process_daily_overview': 1800,
+    'process_presence': 120
+}
@@ -1,12 +1,23 @@
 from config.config import BASE_URL
 from datetime import datetime
-import pytz
+from typing import Optional
 from utils.achievement import CONSOLE_NAME_MAP
+from utils.lazy import lazy
+from utils.datetime import parse_api_date, format_local
 
 class Achievement:
     """
     A class to represent an Achievement.
+
+    Only the raw fields are set on construction, the URLs, formatted points, the parsed date and
+    the local date are derived on first access and cached.
     """
+    __slots__ = (
+        'achievement_id', 'author', 'badge_name', 'badge_path', 'console_name', 'cumul_score', 'date', 'description',
+        'game_icon_path', 'game_id', 'game_title', 'game_path', 'mode', 'points', 'retropoints', 'title', 'type',
+        '_badge_url', '_game_icon', '_game_url', '_url', '_timestamp', '_date_amsterdam', '_retropoints_format',
+    )
+
     def __init__(self, data: dict):
         """
         Constructs all the necessary attributes for the Achievement object.
@@ -19,23 +30,51 @@ class Achievement:
         self.achievement_id = data.get('AchievementID', "N/A")
         self.author = data.get('Author', "N/A")
         self.badge_name = data.get('BadgeName', "N/A")
-        self.badge_url = f"{BASE_URL}{data.get('BadgeURL', '')}"
+        self.badge_path = data.get('BadgeURL', '')
         self.console_name = data.get('ConsoleName', "N/A")
         self.cumul_score = data.get('CumulScore', "N/A")
         self.date = data.get('Date', "N/A")
-        self.date_amsterdam = self.format_date(self.date) if self.date != "N/A" else "N/A"
         self.description = data.get('Description', "N/A")
-        self.game_icon = f"{BASE_URL}{data.get('GameIcon', '')}"
+        self.game_icon_path = data.get('GameIcon', '')
         self.game_id = data.get('GameID', "N/A")
         self.game_title = data.get('GameTitle', "N/A")
-        self.game_url = f"{BASE_URL}{data.get('GameURL', '')}"
+        self.game_path = data.get('GameURL', '')
         self.mode = "Hardcore" if data.get('HardcoreMode', 0) == 1 else "Softcore"
         self.points = data.get('Points', "N/A")
         self.retropoints = data.get('TrueRatio', 0)
-        self.retropoints_format = self.format_points(self.retropoints)
         self.title = data.get('Title', "N/A")
         self.type = data.get('Type', "N/A")
-        self.url = f"{BASE_URL}/achievement/{self.achievement_id}" if self.achievement_id != "N/A" else "N/A"
+
+    @lazy
+    def badge_url(self) -> str:
+        return f"{BASE_URL}{self.badge_path}"
+
+    @lazy
+    def game_icon(self) -> str:
+        return f"{BASE_URL}{self.game_icon_path}"
+
+    @lazy
+    def game_url(self) -> str:
+        return f"{BASE_URL}{self.game_path}"
+
+    @lazy
+    def url(self) -> str:
+        return f"{BASE_URL}/achievement/{self.achievement_id}" if self.achievement_id != "N/A" else "N/A"
+
+    @lazy
+    def timestamp(self) -> Optional[datetime]:
+        """
+        The date of the unlock as a timezone-aware datetime, parsed once. Sort and window on this.
+        """
+        return parse_api_date(self.date) if self.date != "N/A" else None
+
+    @lazy
+    def date_amsterdam(self) -> str:
+        return self.format_date(self.timestamp) if self.timestamp is not None else "N/A"
+
+    @lazy
+    def retropoints_format(self) -> str:
+        return self.format_points(self.retropoints)
 
     def format_points(self, points: int) -> str:
         """
@@ -53,21 +92,21 @@ class Achievement:
         """
         return format(points, ',').replace(',', '.') if points >= 10000 else str(points)
 
-    def format_date(self, date: str) -> str:
+    def format_date(self, date: datetime) -> str:
         """
-        Formats the date to Amsterdam timezone.
+        Formats the date in the configured timezone.
 
         Parameters
         ----------
-        date : str
-            The date to be formatted.
+        date : datetime
+            The timezone-aware date to be formatted.
 
         Returns
         -------
         str
             The formatted date.
         """
-        return datetime.strptime(date, "%Y-%m-%d %H:%M:%S").replace(tzinfo=pytz.UTC).astimezone(pytz.timezone('Europe/Amsterdam')).strftime("%d/%m/%y %H:%M:%S")
+        return format_local(date, "%d/%m/%y %H:%M:%S")
 
     def remap_console_name(self) -> str:
             """
@@ -1,20 +1,67 @@
-import requests
+import aiohttp
+import asyncio
+import json
 from typing import List
 
-from config.config import RETROACHIEVEMENTS_INTERVAL, BASE_URL
+from config.config import RETROACHIEVEMENTS_INTERVAL, BASE_URL, API_TIMEOUT, API_CACHE_MAX_ENTRIES, API_CACHE_MAX_BYTES, API_RATE_LIMIT, API_RATE_BURST, API_MAX_RETRIES, API_CIRCUIT_THRESHOLD, API_CIRCUIT_COOLDOWN, API_TRANSPORT, API_RECORDINGS_DIR, API_REPLAY_LATENCY
 from utils.custom_logger import logger
+from utils.event_store import event_store
 
 from services.profile import Profile
 from services.game import Game, UnlockDistribution
 from services.achievement import Achievement
 from services.progress import Progress
+from services.cache import ResponseCache, SingleFlight
+from services.transport import create_transport, TransportError
+from services.ratelimit import TokenBucket, CircuitBreaker, CircuitOpenError, RetryableResponse, backoff_delay, parse_retry_after
+
+response_cache = ResponseCache(API_CACHE_MAX_ENTRIES, API_CACHE_MAX_BYTES)
+in_flight = SingleFlight()
+rate_limiter = TokenBucket(API_RATE_LIMIT, API_RATE_BURST)
+circuit_breaker = CircuitBreaker(API_CIRCUIT_THRESHOLD, API_CIRCUIT_COOLDOWN)
+_refresh_tasks = set()  # Keep references to background refreshes so they are not garbage collected
+
+transport = create_transport(API_TRANSPORT, API_RECORDINGS_DIR, API_REPLAY_LATENCY)
+
+def set_transport(new_transport) -> None:
+    """
+    set_transport
+
+    Explanation:
+    Replaces the transport every API class sends its requests through, for example with a
+    ReplayTransport to run a poll cycle without network access.
+    """
+    global transport
+    transport = new_transport
+
+async def close_session() -> None:
+    """
+    close_session
+
+    Explanation:
+    Closes the transport's shared session, should be called once when the bot shuts down.
+    """
+    await transport.close()
 
 class BaseAPI:
     """
     BaseAPI: Base class for API requests
 
     Explanation:
-    Handles the base functionality for making API requests.
+    Handles the base functionality for making API requests through the configured transport
+    (live, record or replay). Subclasses are awaitable, awaiting an instance fetches the
+    data, hands it to parse() and returns the instance:
+
+        profile = await UserProfile(username, api_username, api_key)
+
+    Responses are cached per endpoint and params for CACHE_TTL seconds. Once expired, an
+    entry is still served for CACHE_STALE seconds while it is refreshed in the background.
+    A CACHE_TTL of 0 disables caching for that endpoint. Identical requests that are in
+    flight at the same time share a single network call, cached or not.
+
+    Every request goes through the shared rate limiter. 429 and 5xx responses and connection
+    errors are retried with exponential backoff (or the server's Retry-After), and too many
+    consecutive failures open the circuit breaker, which refuses requests until it cools down.
 
     Args:
     - endpoint: The API endpoint to request data from.
@@ -24,16 +71,80 @@ class BaseAPI:
     - dict: The JSON response data from the API.
     """
     BASE_API_URL = f"{BASE_URL}/API/"
+    CACHE_TTL = 0
+    CACHE_STALE = 0
 
     def __init__(self, endpoint: str, params: dict):
         self.endpoint = endpoint
         self.params = params
 
-    def fetch_data(self) -> dict:
+    def cache_key(self) -> tuple:
+        # The API key is the same for every request, leave it out of the key
+        return self.endpoint, tuple(sorted((key, str(value)) for key, value in self.params.items() if key != 'y'))
+
+    async def fetch_data(self) -> dict:
+        key = self.cache_key()
+        if not self.CACHE_TTL:
+            data, _ = await in_flight.do(key, self.request)
+            return data
+        if entry := response_cache.get(key):
+            if not entry.is_fresh() and not entry.refreshing:
+                entry.refreshing = True
+                task = asyncio.create_task(self.refresh(key))
+                _refresh_tasks.add(task)
+                task.add_done_callback(_refresh_tasks.discard)
+            logger.debug(f"Cache hit for {self.endpoint}")
+            return entry.data
+        return await in_flight.do(key, lambda: self.request_and_cache(key))
+
+    async def request_and_cache(self, key: tuple) -> dict:
+        data, size = await self.request()
+        response_cache.set(key, data, size, self.CACHE_TTL, self.CACHE_STALE)
+        return data
+
+    async def refresh(self, key: tuple) -> None:
+        try:
+            await in_flight.do(key, lambda: self.request_and_cache(key))
+        except Exception as e:
+            logger.warning(f"Error refreshing cached {self.endpoint}: {e}")
+            if entry := response_cache.get(key):
+                entry.refreshing = False  # Let the next hit try again
+
+    async def request(self) -> tuple:
         url = f"{self.BASE_API_URL}{self.endpoint}"
-        response = requests.get(url, params=self.params)
-        response.raise_for_status()
-        return response.json()
+        for attempt in range(API_MAX_RETRIES + 1):
+            if circuit_breaker.is_open():
+                raise CircuitOpenError(f"RetroAchievements API paused for {circuit_breaker.remaining():.0f} seconds after repeated failures")
+            await rate_limiter.acquire()
+            try:
+                response = await transport.get(url, self.params, API_TIMEOUT)
+                if response.status == 429 or response.status >= 500:
+                    raise RetryableResponse(response.status, parse_retry_after(response.headers.get('Retry-After')))
+                if response.status >= 400:
+                    raise TransportError(response.status, url)
+            except (RetryableResponse, aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                circuit_breaker.record_failure()
+                if attempt == API_MAX_RETRIES:
+                    raise
+                retry_after = getattr(e, 'retry_after', None)
+                delay = retry_after if retry_after is not None else backoff_delay(attempt)
+                if getattr(e, 'status', None) == 429:
+                    rate_limiter.pause(delay)  # Throttled, so every request has to back off, not just this one
+                logger.warning(f"Request to {self.endpoint} failed ({str(e) or type(e).__name__}), retrying in {delay:.1f} seconds")
+                await asyncio.sleep(delay)
+                continue
+            circuit_breaker.record_success()
+            return json.loads(response.body), len(response.body)
+
+    def parse(self, data) -> None:
+        raise NotImplementedError
+
+    async def load(self):
+        self.parse(await self.fetch_data())
+        return self
+
+    def __await__(self):
+        return self.load().__await__()
 
 class GameDetails(BaseAPI):
     """
@@ -50,13 +161,18 @@ class GameDetails(BaseAPI):
     Returns:
     - Game: The game details.
     """
+    CACHE_TTL = 6 * 3600  # Game metadata rarely changes
+    CACHE_STALE = 24 * 3600
+
     def __init__(self, game_id: str, api_username: str, api_key: str):
         super().__init__("API_GetGameExtended.php", {'z': api_username, 'y': api_key, 'i': game_id})
         logger.debug(f"Fetching game details for game {game_id}")
-        data = self.fetch_data()
+
+    def parse(self, data) -> None:
         truncated_data = str(data)[:1000]  # Convert the data to a string and take the first 1000 characters (because the response is huge)
         logger.debug(f"API response (truncated): {truncated_data}")
         self.game = Game(data)
+        event_store.record_game(self.game)
 
     def get_game(self) -> Game:
         return self.game
@@ -79,10 +195,12 @@ class UserCompletionRecent(BaseAPI):
     def __init__(self, username: str, api_username: str, api_key: str):
         super().__init__("API_GetUserRecentAchievements.php", {'z': api_username, 'y': api_key, 'u': username, 'm': RETROACHIEVEMENTS_INTERVAL})
         logger.debug(f"Fetching recent data for user {username}")
-        data = self.fetch_data()
-        logger.debug(f"API response: {data}")
         self.user = username
+
+    def parse(self, data) -> None:
+        logger.debug(f"API response: {data}")
         self.achievements = [Achievement(item) for item in data]
+        event_store.record_unlocks(self.user, self.achievements)  # Keep the history locally
 
     def get_achievements(self) -> List[Achievement]:
         return self.achievements
@@ -107,10 +225,12 @@ class UserCompletionByDate(BaseAPI):
     def __init__(self, username: str, api_username: str, api_key: str, start_date: str, end_date: str):
         super().__init__("API_GetAchievementsEarnedBetween.php", {'z': api_username, 'y': api_key, 'u': username, 'f': start_date, 't': end_date})
         logger.debug(f"Fetching data for user {username} between {start_date} and {end_date}")
-        data = self.fetch_data()
-        logger.debug(f"API response: {data}")
         self.user = username
+
+    def parse(self, data) -> None:
+        logger.debug(f"API response: {data}")
         self.achievements = [Achievement(item) for item in data]
+        event_store.record_unlocks(self.user, self.achievements)  # Keep the history locally
 
     def get_achievements(self) -> List[Achievement]:
         return self.achievements
@@ -132,16 +252,46 @@ class UserCompletionProgress(BaseAPI):
     Returns:
     - Progress: The user's completion progress
     """
+    CACHE_TTL = 30
+    CACHE_STALE = 0
+
     def __init__(self, username: str, api_username: str, api_key: str, count: int = 100, offset: int = 0):
         super().__init__("API_GetUserCompletionProgress.php", {'z': api_username, 'y': api_key, 'u': username, 'c': count, 'o': offset})
         logger.debug(f"Fetching progress data for user {username}")
-        data = self.fetch_data()
         self.user = username
+
+    def parse(self, data) -> None:
         self.progress = Progress(data)
 
     def get_progress(self) -> Progress:
         return self.progress
 
+async def fetch_all_progress(username: str, api_username: str, api_key: str, page_size: int = 500) -> Progress:
+    """
+    fetch_all_progress
+
+    Explanation:
+    Retrieves a user's complete completion progress. The first page tells how many games
+    the user has, the remaining pages are then fetched concurrently and merged.
+
+    Args:
+    - username: The username of the user.
+    - api_username: The API username for authentication.
+    - api_key: The API key for authentication.
+    - page_size: The number of progress items per request (the API allows at most 500).
+
+    Returns:
+    - Progress: The user's completion progress for every game.
+    """
+    first_page = await UserCompletionProgress(username, api_username, api_key, count=page_size)
+    progress = first_page.get_progress()
+    offsets = range(page_size, progress.total or 0, page_size)
+    pages = await asyncio.gather(*(UserCompletionProgress(username, api_username, api_key, count=page_size, offset=offset).load() for offset in offsets))
+    for page in pages:
+        progress.extend(page.get_progress())
+    logger.debug(f"Fetched {len(progress.results)} progress items for user {username} in {len(pages) + 1} pages")
+    return progress
+
 class UserProgressGameInfo(BaseAPI):
     """
     UserProgressGameInfo
@@ -158,14 +308,19 @@ class UserProgressGameInfo(BaseAPI):
     Returns:
     - Game: The game progress information for the user. 
     """
+    CACHE_TTL = 30  # User progress must be fresh every cycle, only share it within one
+    CACHE_STALE = 0
+
     def __init__(self, game_id: str, username: str, api_username: str, api_key: str):
         super().__init__("API_GetGameInfoAndUserProgress.php", {'z': api_username, 'y': api_key, 'u': username, 'g': game_id})
         logger.debug(f"Fetching progress data for user {username} in game {game_id}")
-        data = self.fetch_data()
+        self.user = username
+
+    def parse(self, data) -> None:
         truncated_data = str(data)[:1000]  # Convert the data to a string and take the first 1000 characters (because the response is huge)
         logger.debug(f"API response (truncated): {truncated_data}")
-        self.user = username
         self.game = Game(data)
+        event_store.record_game(self.game)
 
     def get_game(self) -> Game:
         return self.game
@@ -185,10 +340,14 @@ class UserProfile(BaseAPI):
     Returns:
     - Profile: The user's profile data.
     """
+    CACHE_TTL = 120
+    CACHE_STALE = 0
+
     def __init__(self, username: str, api_username: str, api_key: str):
         super().__init__("API_GetUserProfile.php", {'z': api_username, 'y': api_key, 'u': username})
         logger.debug(f"Fetching profile data for user {username}")
-        data = self.fetch_data()
+
+    def parse(self, data) -> None:
         logger.debug(f"API response: {data}")
         self.profile = Profile(data)
 
@@ -210,10 +369,14 @@ class GameUnlocks(BaseAPI):
     Returns:
     - UnlockDistribution: The achievement distribution data for the game.
     """
+    CACHE_TTL = 0  # Parsed distributions are cached per game by services.distribution
+    CACHE_STALE = 0
+
     def __init__(self, username: str, api_key: str, game_id: str):
         super().__init__("API_GetAchievementDistribution.php", {'z': username, 'y': api_key, 'i': game_id, 'h': '1'})
         logger.debug(f"Fetching Achievement Distribution data for game {game_id}")
-        data = self.fetch_data()
+
+    def parse(self, data) -> None:
         logger.debug(f"API response: {data}")
         self.distribution = UnlockDistribution(data)
 
@@ -0,0 +1,100 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+class CacheEntry:
+    """
+    CacheEntry
+
+    Explanation:
+    A single cached API response with its size and expiry times.
+
+    Args:
+    - data: The parsed JSON response.
+    - size: The size of the raw response body in bytes.
+    - ttl: The number of seconds the entry is fresh.
+    - stale: The number of seconds after expiry the entry may still be served while it is refreshed.
+    """
+    __slots__ = ('data', 'size', 'expires_at', 'stale_until', 'refreshing')
+
+    def __init__(self, data: Any, size: int, ttl: float, stale: float):
+        now = time.monotonic()
+        self.data = data
+        self.size = size
+        self.expires_at = now + ttl
+        self.stale_until = self.expires_at + stale
+        self.refreshing = False
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+    def is_usable(self) -> bool:
+        return time.monotonic() < self.stale_until
+
+class ResponseCache:
+    """
+    ResponseCache
+
+    Explanation:
+    An in-memory LRU cache for API responses. Entries expire after their TTL and are
+    evicted least recently used first once either the entry or the byte limit is reached.
+
+    Args:
+    - max_entries: The maximum number of cached responses.
+    - max_bytes: The maximum total size of the cached response bodies.
+    """
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+
+    def get(self, key) -> Optional[CacheEntry]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if not entry.is_usable():
+            self.remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def set(self, key, data: Any, size: int, ttl: float, stale: float = 0) -> None:
+        if size > self.max_bytes:
+            return  # Never let a single response flush the whole cache
+        self.remove(key)
+        self.entries[key] = CacheEntry(data, size, ttl, stale)
+        self.total_bytes += size
+        while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= evicted.size
+
+    def remove(self, key) -> None:
+        if (entry := self.entries.pop(key, None)) is not None:
+            self.total_bytes -= entry.size
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.total_bytes = 0
+
+class SingleFlight:
+    """
+    SingleFlight
+
+    Explanation:
+    Coalesces identical calls that are in flight at the same time. The first caller for a
+    key starts the call, every caller that arrives before it finishes awaits the same
+    result (or exception) instead of starting its own.
+    """
+    def __init__(self):
+        self.calls = {}
+
+    async def do(self, key, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self.calls[key] = task
+            task.add_done_callback(lambda _: self.calls.pop(key, None))
+        # Shield the shared call so one waiter timing out does not cancel it for the others
+        return await asyncio.shield(task)
@@ -0,0 +1,168 @@
+import asyncio
+from collections import deque
+
+import discord
+
+from services.ratelimit import TokenBucket
+from config.config import DISCORD_RATE_LIMIT, DISCORD_RATE_BURST
+from utils.custom_logger import logger
+
+MAX_EMBEDS_PER_MESSAGE = 10  # Discord's limit
+MAX_CHARS_PER_MESSAGE = 6000  # Discord's limit on the combined length of a message's embeds
+
+class EmbedDispatcher:
+    """
+    EmbedDispatcher
+
+    Explanation:
+    The single way embeds are sent to Discord. Every channel has its own queue, worked off in
+    order by one task, so embeds keep the order they were queued in. Each message carries up to
+    10 embeds with at most 6000 characters between them, Discord's limits, and takes a token
+    from the channel's bucket before it is sent, so the bot stays under Discord's per-channel
+    rate limit instead of waiting for a 429 to slow it down.
+
+    Args:
+    - rate: The number of messages per second per channel.
+    - burst: The maximum number of messages that can be sent to a channel back to back.
+    """
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.queues = {}  # Channel to a deque of (embed, future, is_last, key, (on_sent, on_rejected)) items
+        self.solo = {}  # Channel to the number of embeds at the front of its queue that are sent one per message
+        self.buckets = {}
+        self.workers = {}
+
+    def queue_depth(self, channel=None) -> int:
+        """
+        The number of embeds waiting to be sent, to one channel or to all of them.
+        """
+        if channel is not None:
+            return len(self.queues.get(channel, ()))
+        return sum(len(queue) for queue in self.queues.values())
+
+    def enqueue(self, channel, embeds, keys=None, on_sent=None, on_rejected=None) -> asyncio.Future:
+        """
+        Queue embeds for a channel.
+
+        When Discord rejects a message with a 4xx other than 429 its embeds are sent again one
+        per message, so a single bad embed cannot take the others down with it. An embed that is
+        rejected on its own is reported to `on_rejected` and skipped, the rest of the group is sent.
+
+        Args:
+        - keys: An optional key per embed, passed to the callbacks.
+        - on_sent: Called with the keys of the embeds in every message Discord accepted, as soon as
+          it is accepted. Embeds that were delivered before a later message failed or the caller
+          was cancelled are reported too.
+        - on_rejected: Called with the key of an embed Discord rejected and the exception.
+
+        Returns:
+        - A future that is done once every embed has been sent or rejected, or holds the exception that stopped them.
+        """
+        future = asyncio.get_running_loop().create_future()
+        if not embeds:
+            future.set_result(None)
+            return future
+        keys = keys if keys is not None else [None] * len(embeds)
+        queue = self.queues.setdefault(channel, deque())
+        for i, (embed, key) in enumerate(zip(embeds, keys)):
+            queue.append((embed, future, i == len(embeds) - 1, key, (on_sent, on_rejected)))
+        logger.info(f"Queued {len(embeds)} embeds for {channel}, {len(queue)} waiting")
+        worker = self.workers.get(channel)
+        if worker is None or worker.done():
+            self.workers[channel] = asyncio.create_task(self.work(channel))
+        return future
+
+    async def send(self, channel, embeds, keys=None, on_sent=None, on_rejected=None) -> None:
+        """
+        Queue embeds for a channel and wait until they have been sent.
+        """
+        await self.enqueue(channel, embeds, keys, on_sent, on_rejected)
+
+    async def work(self, channel) -> None:
+        queue = self.queues[channel]
+        bucket = self.buckets.setdefault(channel, TokenBucket(self.rate, self.burst))
+        while queue:
+            await bucket.acquire()
+            solo = self.solo.get(channel, 0)
+            limit = 1 if solo else MAX_EMBEDS_PER_MESSAGE
+            batch = []
+            length = 0
+            while queue and len(batch) < limit:
+                item = queue[0]
+                if item[1].done():  # Skip what is left of a group that already failed
+                    queue.popleft()
+                    solo = max(0, solo - 1)
+                    continue
+                if batch and length + len(item[0]) > MAX_CHARS_PER_MESSAGE:
+                    break  # The embed starts the next message
+                batch.append(queue.popleft())
+                length += len(item[0])
+                solo = max(0, solo - 1)
+            self.solo[channel] = solo
+            if not batch:
+                continue
+            try:
+                await channel.send(embeds=[item[0] for item in batch])
+            except discord.RateLimited as e:
+                logger.warning(f"Rate limited sending to {channel}, retrying in {e.retry_after:.1f} seconds")
+                bucket.pause(e.retry_after)
+                self.requeue(channel, batch, solo=limit == 1)
+                continue
+            except discord.HTTPException as e:
+                if not 400 <= e.status < 500 or e.status == 429:
+                    self.fail(channel, batch, e)
+                elif len(batch) > 1:
+                    logger.warning(f"Discord rejected {len(batch)} embeds for {channel}, sending them one per message: {e}")
+                    self.requeue(channel, batch, solo=True)
+                else:
+                    self.reject(channel, batch[0], e)
+                continue
+            except Exception as e:
+                self.fail(channel, batch, e)
+                continue
+            self.report_sent(batch)
+            for _, future, is_last, _, _ in batch:
+                if is_last and not future.done():
+                    future.set_result(None)
+
+    def requeue(self, channel, batch, solo: bool) -> None:
+        self.queues[channel].extendleft(reversed(batch))
+        if solo:
+            self.solo[channel] = self.solo.get(channel, 0) + len(batch)
+
+    def fail(self, channel, batch, error) -> None:
+        logger.error(f"Error sending {len(batch)} embeds to {channel}: {error}")
+        for _, future, _, _, _ in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    def reject(self, channel, item, error) -> None:
+        embed, future, is_last, key, (_, on_rejected) = item
+        logger.error(f"Discord rejected an embed for {channel}, skipping it: {error}")
+        if on_rejected is not None:
+            try:
+                on_rejected(key, error)
+            except Exception as e:
+                logger.error(f"Error recording a rejected embed: {e}")
+        if is_last and not future.done():
+            future.set_result(None)
+
+    def report_sent(self, batch) -> None:
+        sent = {}
+        for _, _, _, key, (on_sent, _) in batch:
+            if on_sent is not None:
+                sent.setdefault(on_sent, []).append(key)
+        for on_sent, keys in sent.items():
+            try:
+                on_sent(keys)
+            except Exception as e:
+                logger.error(f"Error recording {len(keys)} sent embeds: {e}")
+
+    async def close(self) -> None:
+        for worker in self.workers.values():
+            worker.cancel()
+        await asyncio.gather(*self.workers.values(), return_exceptions=True)
+        self.workers.clear()
+
+dispatcher = EmbedDispatcher(DISCORD_RATE_LIMIT, DISCORD_RATE_BURST)
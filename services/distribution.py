@@ -0,0 +1,66 @@
+import time
+from datetime import datetime
+from typing import Optional
+
+from services.api import GameUnlocks
+from services.cache import SingleFlight
+from services.game import UnlockDistribution
+from config.config import DISTRIBUTION_TTL
+from utils.custom_logger import logger
+
+class DistributionCache:
+    """
+    DistributionCache
+
+    Explanation:
+    Keeps the parsed hardcore unlock distribution of every game that was mastered recently.
+    A distribution is fetched once and reused for `ttl` seconds, concurrent requests for the
+    same game share one fetch. When a tracked user masters a game after its distribution was
+    fetched, they are added to it locally, so a burst of masteries on one set costs a single
+    request and still counts every new master.
+
+    Args:
+    - ttl: The number of seconds a distribution is reused before it is fetched again.
+    """
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.entries = {}  # Game ID to (distribution, fetched at epoch, users added locally)
+        self.in_flight = SingleFlight()
+
+    async def get(self, game_id, api_username: str, api_key: str) -> UnlockDistribution:
+        entry = self.entries.get(game_id)
+        if entry is not None and time.time() - entry[1] < self.ttl:
+            return entry[0]
+        return await self.in_flight.do(game_id, lambda: self.fetch(game_id, api_username, api_key))
+
+    async def fetch(self, game_id, api_username: str, api_key: str) -> UnlockDistribution:
+        fetched_at = time.time()
+        game_unlocks = await GameUnlocks(api_username, api_key, game_id)
+        distribution = game_unlocks.get_distribution()
+        self.entries[game_id] = (distribution, fetched_at, set())
+        logger.debug(f"Cached unlock distribution for game {game_id}")
+        return distribution
+
+    def add_mastery(self, game_id, user: str, achievement_count: int, mastered_at: Optional[datetime]) -> None:
+        """
+        Counts a tracked user's mastery in the cached distribution, unless the fetch already included it.
+
+        Args:
+        - game_id: The ID of the mastered game.
+        - user: The user who mastered it, each user is only added once per fetch.
+        - achievement_count: The number of achievements in the set.
+        - mastered_at: When the game was mastered.
+        """
+        entry = self.entries.get(game_id)
+        if entry is None or mastered_at is None:
+            return
+        distribution, fetched_at, added_users = entry
+        if mastered_at.timestamp() < fetched_at or user in added_users:
+            return
+        distribution.add_player(achievement_count)
+        added_users.add(user)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+distribution_cache = DistributionCache(DISTRIBUTION_TTL)
@@ -1,11 +1,66 @@
 from config.config import BASE_URL
 from utils.achievement import CONSOLE_NAME_MAP
-from utils.datetime import calculate_time_difference
+from array import array
+from bisect import bisect_left
+from typing import Optional
+
+from utils.datetime import format_duration, api_date_to_epoch
+from utils.lazy import lazy
+
+class AchievementTable:
+    """
+    The numbers of a game's achievements, stored column by column.
+
+    Built once in a single pass over the achievements. Each column is an array with one row per
+    achievement, `rows` maps an achievement ID to its row. The totals the embeds need are
+    computed during the same pass, so every lookup afterwards is O(1).
+    """
+    __slots__ = ('rows', 'points', 'true_ratio', 'num_awarded_hardcore', 'earned_hardcore', 'total_true_ratio',
+                 'earned_hardcore_count', 'first_earned_hardcore', 'last_earned_hardcore')
+
+    def __init__(self, achievements: dict):
+        self.rows = {}
+        self.points = array('l')
+        self.true_ratio = array('l')
+        self.num_awarded_hardcore = array('l')
+        self.earned_hardcore = array('q')  # Epoch of the user's hardcore unlock, 0 when not earned
+        self.total_true_ratio = 0
+        self.earned_hardcore_count = 0
+        self.first_earned_hardcore = self.last_earned_hardcore = None  # Epochs, taken from the same parse as earned_hardcore
+        for row, (achievement_id, achievement_data) in enumerate(achievements.items()):
+            self.rows[achievement_id] = row
+            self.points.append(achievement_data.get('Points') or 0)
+            true_ratio = achievement_data.get('TrueRatio') or 0
+            self.true_ratio.append(true_ratio)
+            self.total_true_ratio += true_ratio
+            self.num_awarded_hardcore.append(achievement_data.get('NumAwardedHardcore') or 0)
+            if earned := achievement_data.get('DateEarnedHardcore'):
+                epoch = api_date_to_epoch(earned)
+                self.earned_hardcore.append(epoch)
+                self.earned_hardcore_count += 1
+                if self.first_earned_hardcore is None or epoch < self.first_earned_hardcore:
+                    self.first_earned_hardcore = epoch
+                if self.last_earned_hardcore is None or epoch > self.last_earned_hardcore:
+                    self.last_earned_hardcore = epoch
+            else:
+                self.earned_hardcore.append(0)
 
 class Game:
     """
     A class to represent a Game.
+
+    Only the raw fields are set on construction, the URLs are derived on first access and cached.
+    Achievements are keyed by their ID, a title index and the columnar AchievementTable are
+    built on first use.
     """
+    __slots__ = (
+        'achievement_set_version_hash', 'achievements', 'console_id', 'console_name', 'developer', 'flags', 'forum_topic_id',
+        'genre', 'guideurl', 'id', 'image_boxart_path', 'image_icon_path', 'image_ingame_path', 'image_title', 'isfinal',
+        'parent_game_id', 'publisher', 'released', 'richpresence', 'title', 'total_achievements', 'total_achievements_earned_hardcore',
+        'total_achievements_earned_softcore', 'total_players_hardcore', 'total_players_softcore', 'total_points', 'updated',
+        'user_completion_hardcore', '_image_boxart', '_image_icon', '_image_ingame', '_url', '_achievements_by_title', '_table',
+    )
+
     def __init__(self, data: dict):
         """
         Constructs all the necessary attributes for the Game object.
@@ -15,9 +70,9 @@ class Game:
         """
         self.achievement_set_version_hash = data.get('achievement_set_version_hash', "N/A")
         self.achievements = {}
-        achievements_data = data.get('Achievements', {})
+        achievements_data = data.get('Achievements') or {}
         for id, achievement_data in achievements_data.items():
-            self.achievements[achievement_data['Title']] = achievement_data
+            self.achievements[int(achievement_data.get('ID', id))] = achievement_data
         self.console_id = data.get('ConsoleID', "N/A")
         self.console_name = data.get('ConsoleName', "N/A")
         self.developer = data.get('Developer', "N/A")
@@ -26,9 +81,9 @@ class Game:
         self.genre = data.get('Genre', "N/A")
         self.guideurl = data.get('GuideURL', "No guide available")
         self.id = data.get('ID', "N/A")
-        self.image_boxart = f"{BASE_URL}{data.get('ImageBoxArt', '')}"
-        self.image_icon = f"{BASE_URL}{data.get('ImageIcon', '')}"
-        self.image_ingame = f"{BASE_URL}{data.get('ImageIngame', '')}"
+        self.image_boxart_path = data.get('ImageBoxArt', '')
+        self.image_icon_path = data.get('ImageIcon', '')
+        self.image_ingame_path = data.get('ImageIngame', '')
         self.image_title = data.get('ImageTitle', "N/A")
         self.isfinal = data.get('IsFinal', "N/A")
         self.parent_game_id = data.get('ParentGameID', "N/A")
@@ -43,9 +98,53 @@ class Game:
         self.total_players_softcore = data.get('NumDistinctPlayersCasual', "N/A")
         self.total_points = data.get('points_total', "N/A")
         self.updated = data.get('Updated', "N/A")
-        self.url = f"{BASE_URL}/game/{self.id}" if self.id != "N/A" else "N/A"
         self.user_completion_hardcore = data.get('UserCompletionHardcore', "N/A")
 
+    @lazy
+    def image_boxart(self) -> str:
+        return f"{BASE_URL}{self.image_boxart_path}"
+
+    @lazy
+    def image_icon(self) -> str:
+        return f"{BASE_URL}{self.image_icon_path}"
+
+    @lazy
+    def image_ingame(self) -> str:
+        return f"{BASE_URL}{self.image_ingame_path}"
+
+    @lazy
+    def url(self) -> str:
+        return f"{BASE_URL}/game/{self.id}" if self.id != "N/A" else "N/A"
+
+    @lazy
+    def achievements_by_title(self) -> dict:
+        """
+        The achievements keyed by title. Titles are not unique within a set, prefer the ID.
+        """
+        return {achievement_data['Title']: achievement_data for achievement_data in self.achievements.values()}
+
+    @lazy
+    def table(self) -> AchievementTable:
+        return AchievementTable(self.achievements)
+
+    def num_awarded_hardcore(self, achievement_id: int) -> int:
+        """
+        Returns the number of players who earned the achievement in hardcore.
+        """
+        return self.table.num_awarded_hardcore[self.table.rows[int(achievement_id)]]
+
+    def unlock_percentage(self, achievement_id: int) -> float:
+        """
+        Returns the percentage of the game's hardcore players who earned the achievement.
+        """
+        return (self.num_awarded_hardcore(achievement_id) / self.total_players_hardcore) * 100 if self.total_players_hardcore else 0
+
+    def earned_hardcore_date(self, achievement_id: int) -> Optional[int]:
+        """
+        Returns the epoch the user earned the achievement in hardcore, or None when they did not.
+        """
+        return self.table.earned_hardcore[self.table.rows[int(achievement_id)]] or None
+
     def is_completed(self) -> bool:
         """
         Checks if the game is completed by the user.
@@ -71,13 +170,8 @@ class Game:
         Returns:
             str: A string representing the time passed between the first and last hardcore achievement.
         """
-        if dates := [
-            achievement_data.get('DateEarnedHardcore')
-            for achievement_data in self.achievements.values()
-            if achievement_data.get('DateEarnedHardcore')
-        ]:
-            earliest, latest = min(dates), max(dates)
-            return calculate_time_difference(earliest, latest)
+        if self.table.earned_hardcore_count:
+            return format_duration(self.table.last_earned_hardcore - self.table.first_earned_hardcore)
         else:
             return "No hardcore achievements earned"
 
@@ -88,8 +182,7 @@ class Game:
         Returns:
             str: The total TrueRatio for all achievements, formatted with points.
         """
-        total_true_ratio = sum(achievement_data.get('TrueRatio', 0) for achievement_data in self.achievements.values())
-        return f"{total_true_ratio:,}".replace(',', '.')
+        return f"{self.table.total_true_ratio:,}".replace(',', '.')
 
 class UnlockDistribution:
     """
@@ -97,7 +190,13 @@ class UnlockDistribution:
     of the number of players who have earned a specific number of achievements 
     for a given game ID. This endpoint can be used to determine 
     the total mastery count for a game, as well as how rare that overall mastery is.
+
+    The distribution is parsed once into two sorted arrays, the achievement counts and the
+    number of players with at least that many achievements, so the highest unlock is O(1) and
+    percentile queries are a binary search.
     """
+    __slots__ = ('data', 'counts', 'players', 'at_least', 'highest_unlock')
+
     def __init__(self, data):
         """
         Initializes the UnlockDistribution object.
@@ -106,6 +205,18 @@ class UnlockDistribution:
             data: The data for the UnlockDistribution object.
         """
         self.data = data
+        buckets = sorted((int(count), players) for count, players in (data or {}).items())
+        self.counts = array('l', (count for count, _ in buckets))
+        self.players = array('l', (players for _, players in buckets))
+        self.accumulate()
+
+    def accumulate(self) -> None:
+        # Players with at least counts[i] achievements, summed from the top bucket down
+        self.at_least = array('l', self.players)
+        for i in range(len(self.at_least) - 2, -1, -1):
+            self.at_least[i] += self.at_least[i + 1]
+        # The top bucket unless it is empty, then the next one
+        self.highest_unlock = next((self.players[i] for i in range(len(self.players) - 1, -1, -1) if self.players[i] != 0), None)
 
     def get_highest_unlock(self):
         """
@@ -114,6 +225,52 @@ class UnlockDistribution:
         Returns:
             The highest unlock value or None.
         """
-        sorted_keys = sorted(self.data, key=int, reverse=True)  # Sort keys as integers in descending order
-        highest_unlock_key = next((key for key in sorted_keys if self.data[key] != 0), None)
-        return self.data[highest_unlock_key] if highest_unlock_key is not None else None
\ No newline at end of file
+        return self.highest_unlock
+
+    def players_with_at_least(self, achievement_count: int) -> int:
+        """
+        Returns the number of players who earned at least `achievement_count` achievements.
+        """
+        i = bisect_left(self.counts, achievement_count)
+        return self.at_least[i] if i < len(self.at_least) else 0
+
+    def top_percentage(self, achievement_count: int, total_players: Optional[int] = None) -> Optional[float]:
+        """
+        Returns the share of players, as a percentage, who earned at least `achievement_count`
+        achievements, for example 2.5 for "top 2.5% of players".
+
+        Args:
+            achievement_count: The number of earned achievements.
+            total_players: The number of players to compare against, everyone in the distribution by default.
+        """
+        total_players = total_players or (self.at_least[0] if self.at_least else 0)
+        return (self.players_with_at_least(achievement_count) / total_players) * 100 if total_players else None
+
+    def achievements_for_top(self, percentage: float) -> Optional[int]:
+        """
+        Returns the lowest achievement count that puts a player in the top `percentage` percent.
+        """
+        if not self.at_least:
+            return None
+        limit = self.at_least[0] * percentage / 100
+        # at_least decreases with the count, find the first bucket at or under the limit
+        low, high = 0, len(self.at_least)
+        while low < high:
+            middle = (low + high) // 2
+            if self.at_least[middle] <= limit:
+                high = middle
+            else:
+                low = middle + 1
+        return self.counts[low] if low < len(self.counts) else None
+
+    def add_player(self, achievement_count: int) -> None:
+        """
+        Counts one more player with `achievement_count` achievements, for unlocks seen after the distribution was fetched.
+        """
+        i = bisect_left(self.counts, achievement_count)
+        if i < len(self.counts) and self.counts[i] == achievement_count:
+            self.players[i] += 1
+        else:
+            self.counts.insert(i, achievement_count)
+            self.players.insert(i, 1)
+        self.accumulate()
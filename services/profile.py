@@ -1,10 +1,20 @@
 from config.config import BASE_URL
 import time
 
+from utils.lazy import lazy
+
 class Profile:
     """
     A class to represent a Profile.
+
+    Only the raw fields are set on construction, the URLs and formatted point totals are derived
+    on first access and cached.
     """
+    __slots__ = (
+        'user', 'user_pic_path', 'member_since', 'rich_presence_msg', 'last_game_id', 'contrib_count', 'contrib_yield',
+        'total_points', 'total_softcore_points', 'total_true_points', 'permissions', 'untracked', 'id', 'user_wall_active', 'motto',
+        '_user_pic', '_user_pic_unique', '_user_url', '_total_points_format', '_total_softcore_points_format', '_total_true_points_format',
+    )
 
     def __init__(self, data: dict):
         """
@@ -15,26 +25,45 @@ class Profile:
             The data dictionary containing all the game details.
         """
         self.user = data.get('User', "N/A")
-        self.user_pic = f"{BASE_URL}{data.get('UserPic', '')}"
-        self.user_pic_unique = f"{self.user_pic}?timestamp={int(time.time())}"
-        self.user_url = f"{BASE_URL}/user/{self.user}"
+        self.user_pic_path = data.get('UserPic', '')
         self.member_since = data.get('MemberSince', "N/A")
         self.rich_presence_msg = data.get('RichPresenceMsg', "N/A")
         self.last_game_id = data.get('LastGameID', "N/A")
         self.contrib_count = data.get('ContribCount', 0)
         self.contrib_yield = data.get('ContribYield', 0)
         self.total_points = data.get('TotalPoints', 0)
-        self.total_points_format = self.format_points(self.total_points)
         self.total_softcore_points = data.get('TotalSoftcorePoints', 0)
-        self.total_softcore_points_format = self.format_points(self.total_softcore_points)
         self.total_true_points = data.get('TotalTruePoints', 0)
-        self.total_true_points_format = self.format_points(self.total_true_points)
         self.permissions = data.get('Permissions', "N/A")
         self.untracked = data.get('Untracked', "N/A")
         self.id = data.get('ID', "N/A")
         self.user_wall_active = data.get('UserWallActive', "N/A")
         self.motto = data.get('Motto', "N/A")
 
+    @lazy
+    def user_pic(self) -> str:
+        return f"{BASE_URL}{self.user_pic_path}"
+
+    @lazy
+    def user_pic_unique(self) -> str:
+        return f"{self.user_pic}?timestamp={int(time.time())}"  # Busts Discord's image cache when the picture changes
+
+    @lazy
+    def user_url(self) -> str:
+        return f"{BASE_URL}/user/{self.user}"
+
+    @lazy
+    def total_points_format(self) -> str:
+        return self.format_points(self.total_points)
+
+    @lazy
+    def total_softcore_points_format(self) -> str:
+        return self.format_points(self.total_softcore_points)
+
+    @lazy
+    def total_true_points_format(self) -> str:
+        return self.format_points(self.total_true_points)
+
     def format_points(self, points: int) -> str:
         """
         Formats the points with commas as thousands separators.
@@ -1,5 +1,8 @@
 from datetime import datetime
-import pytz
+from typing import Optional
+
+from utils.lazy import lazy
+from utils.datetime import parse_api_date, format_local
 
 class Progress:
     """
@@ -18,21 +21,29 @@ class Progress:
     --------
     progress = Progress(data)
     """
+    __slots__ = ('count', 'total', 'results', 'results_by_game')
+
     def __init__(self, data):
         self.count, self.total, self.results = data.get('Count'), data.get('Total'), [Result(result) for result in data.get('Results', [])]
+        self.results_by_game = {result.game_id: result for result in self.results}
+
+    def extend(self, other):
+        """
+        Appends the results of another page of the same user's progress.
+        """
+        self.results.extend(other.results)
+        self.results_by_game.update(other.results_by_game)
+        self.count = len(self.results)
+
+    def get_result(self, game_id):
+        return self.results_by_game.get(game_id)
 
     def __str__(self):
         results_str = ', '.join(str(result) for result in self.results)
         return f"""Count: {self.count}, Total: {self.total}, Results: [{results_str}]"""
 
     def count_mastered(self):
-        return len(
-            [
-                result
-                for result in self.results
-                if result.highest_award_kind == 'mastered'
-            ]
-        )
+        return sum(1 for result in self.results if result.highest_award_kind == 'mastered')
 
 class Result:
     """
@@ -51,13 +62,28 @@ class Result:
     --------
     result = Result(data)
     """
+    __slots__ = (
+        'game_id', 'title', 'image_icon', 'console_id', 'console_name', 'max_possible', 'num_awarded', 'num_awarded_hardcore',
+        'most_recent_awarded_date', 'highest_award_kind', 'highest_award_date', '_highest_award_timestamp', '_highest_award_date_format',
+    )
+
     def __init__(self, data):
         (self.game_id, self.title, self.image_icon, self.console_id, self.console_name, self.max_possible, 
          self.num_awarded, self.num_awarded_hardcore, self.most_recent_awarded_date, self.highest_award_kind, 
          self.highest_award_date) = (data.get(key) for key in ('GameID', 'Title', 'ImageIcon', 'ConsoleID', 'ConsoleName', 
                                                                'MaxPossible', 'NumAwarded', 'NumAwardedHardcore', 
                                                                'MostRecentAwardedDate', 'HighestAwardKind', 'HighestAwardDate'))
-        self.highest_award_date_format = self.format_date(self.highest_award_date)
+
+    @lazy
+    def highest_award_timestamp(self) -> Optional[datetime]:
+        """
+        The date of the highest award as a timezone-aware datetime, parsed once.
+        """
+        return parse_api_date(self.highest_award_date) if self.highest_award_date else None
+
+    @lazy
+    def highest_award_date_format(self) -> str:
+        return self.format_date(self.highest_award_timestamp)
 
     def __str__(self):
         return (f"GameID: {self.game_id}, Title: {self.title}, ImageIcon: {self.image_icon}, "
@@ -66,19 +92,17 @@ class Result:
                 f"MostRecentAwardedDate: {self.most_recent_awarded_date}, HighestAwardKind: {self.highest_award_kind}, "
                 f"HighestAwardDate: {self.highest_award_date}")
     
-    def format_date(self, date: str) -> str:
+    def format_date(self, date: Optional[datetime]) -> Optional[str]:
         """
-        Formats the date to Amsterdam timezone.
+        Formats the date in the configured timezone.
 
         Args:
-            date : str
-                The date to be formatted.
+            date : datetime
+                The timezone-aware date to be formatted.
 
         Returns
         -------
         str
             The formatted date.
         """
-        if date is None:
-            return None
-        return datetime.strptime(date, "%Y-%m-%dT%H:%M:%S%z").astimezone(pytz.timezone('Europe/Amsterdam')).strftime("%d/%m/%y at %H:%M:%S")
\ No newline at end of file
+        return format_local(date, "%d/%m/%y at %H:%M:%S")
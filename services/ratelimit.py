@@ -0,0 +1,125 @@
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+BACKOFF_BASE = 1  # Seconds before the first retry
+BACKOFF_MAX = 60  # Upper bound for a single backoff
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a request is refused because the circuit breaker is open.
+    """
+
+class RetryableResponse(Exception):
+    """
+    Raised for responses that are worth retrying (429 and 5xx).
+
+    Args:
+    - status: The HTTP status code.
+    - retry_after: The number of seconds the server asked us to wait, if any.
+    """
+    def __init__(self, status: int, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """
+    TokenBucket
+
+    Explanation:
+    A token bucket shared by every request. Tokens refill at `rate` per second up to
+    `burst`, each request takes one token and waits when the bucket is empty. The whole
+    bucket can be paused, for example when the server sends a Retry-After header.
+
+    Args:
+    - rate: The number of requests per second.
+    - burst: The maximum number of requests that can be made back to back.
+    """
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self) -> float:
+        self.refill(time.monotonic())
+        return self.tokens
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        async with self.lock:  # Waiters are served in order
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class CircuitBreaker:
+    """
+    CircuitBreaker
+
+    Explanation:
+    Opens after `threshold` consecutive failures and refuses requests for `cooldown` seconds.
+    After the cooldown requests are let through again, the first success closes the circuit
+    and another failure opens it for a new cooldown.
+
+    Args:
+    - threshold: The number of consecutive failures before the circuit opens.
+    - cooldown: The number of seconds the circuit stays open.
+    """
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def is_open(self) -> bool:
+        return self.failures >= self.threshold and time.monotonic() < self.opened_at + self.cooldown
+
+    def remaining(self) -> float:
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic()) if self.is_open() else 0.0
+
+    def record_success(self) -> None:
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Exponential backoff with full jitter for the given retry attempt (starting at 0).
+    """
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parses a Retry-After header, which is either a number of seconds or an HTTP date.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,138 @@
+import aiohttp
+import asyncio
+import hashlib
+import json
+import os
+from typing import Optional
+
+from utils.custom_logger import logger
+
+# Credentials are never written to disk, the window bounds change on every poll so they are left out of the key
+IGNORED_PARAMS = ('z', 'y', 'f', 't')
+
+class TransportError(Exception):
+    """
+    Raised for a response with a non-retryable HTTP error status.
+    """
+    def __init__(self, status: int, url: str):
+        super().__init__(f"HTTP {status} for {url}")
+        self.status = status
+
+class TransportResponse:
+    """
+    The status, headers and raw body of a single API response.
+    """
+    __slots__ = ('status', 'headers', 'body')
+
+    def __init__(self, status: int, headers: dict, body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+class LiveTransport:
+    """
+    LiveTransport
+
+    Explanation:
+    Sends requests to the RetroAchievements API over one shared aiohttp session. The session
+    is created on first use and keeps its connections alive, so every call reuses the pool.
+    """
+    def __init__(self):
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(ttl_dns_cache=300))
+        return self.session
+
+    async def get(self, url: str, params: dict, timeout: float) -> TransportResponse:
+        session = await self.get_session()
+        async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            return TransportResponse(response.status, dict(response.headers), await response.read())
+
+    async def close(self) -> None:
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+def recording_path(directory: str, url: str, params: dict) -> str:
+    """
+    Returns the file a response for this endpoint and params is recorded to.
+    """
+    endpoint = url.rstrip('/').rsplit('/', 1)[-1].removesuffix('.php')
+    key = json.dumps({k: str(v) for k, v in params.items() if k not in IGNORED_PARAMS}, sort_keys=True)
+    return os.path.join(directory, f"{endpoint}-{hashlib.sha1(key.encode()).hexdigest()[:16]}.json")
+
+class RecordTransport(LiveTransport):
+    """
+    RecordTransport
+
+    Explanation:
+    A live transport that also writes every successful response to `directory`, one file
+    per endpoint and params, so the responses can be served again by ReplayTransport.
+
+    Args:
+    - directory: The directory the responses are recorded to.
+    """
+    def __init__(self, directory: str):
+        super().__init__()
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    async def get(self, url: str, params: dict, timeout: float) -> TransportResponse:
+        response = await super().get(url, params, timeout)
+        if response.status == 200:
+            recording = {
+                'url': url,
+                'params': {k: str(v) for k, v in params.items() if k not in ('z', 'y')},
+                'body': response.body.decode(),
+            }
+            with open(recording_path(self.directory, url, params), 'w') as f:
+                json.dump(recording, f)
+        return response
+
+class ReplayTransport:
+    """
+    ReplayTransport
+
+    Explanation:
+    Serves responses recorded by RecordTransport without touching the network. Requests
+    without a recording get a 404. Each response can be delayed by `latency` seconds to
+    simulate the round trip to the live API.
+
+    Args:
+    - directory: The directory the responses were recorded to.
+    - latency: The number of seconds every response is delayed.
+    """
+    def __init__(self, directory: str, latency: float = 0):
+        self.directory = directory
+        self.latency = latency
+        self.requests = 0
+
+    async def get(self, url: str, params: dict, timeout: float) -> TransportResponse:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        path = recording_path(self.directory, url, params)
+        try:
+            with open(path, 'r') as f:
+                recording = json.load(f)
+        except FileNotFoundError:
+            logger.warning(f"No recording for {url} with {params.get('u', params.get('i', params.get('g')))}")
+            return TransportResponse(404, {}, b'')
+        return TransportResponse(200, {}, recording['body'].encode())
+
+    async def close(self) -> None:
+        pass
+
+def create_transport(mode: str, directory: str, latency: float = 0):
+    """
+    Creates the transport for the configured mode: 'live', 'record' or 'replay'.
+    """
+    if mode == 'live':
+        return LiveTransport()
+    if mode == 'record':
+        return RecordTransport(directory)
+    if mode == 'replay':
+        return ReplayTransport(directory, latency)
+    raise ValueError("Invalid API_TRANSPORT configuration value")
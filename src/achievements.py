@@ -1,140 +1,251 @@
+import asyncio
 import discord
-import json
-from datetime import datetime
+import time
 
-from services.api import UserProgressGameInfo, UserCompletionRecent, UserProfile, UserCompletionProgress, GameUnlocks
-from utils.image import get_discord_color
+from services.api import UserProgressGameInfo, UserCompletionRecent, UserCompletionByDate, UserProfile, fetch_all_progress, circuit_breaker
+from services.dispatch import dispatcher
+from services.distribution import distribution_cache
+from utils.image import get_discord_color, prewarm_game_colors
+from utils.emoji import emoji_registry
 from utils.datetime import ordinal
-from config.config import api_key, api_username, DISCORD_IMAGE, ACHIEVEMENT_EMBED_STYLE
+from utils.cursor import CursorStore
+from utils.outbox import Outbox
+from utils.scheduler import poll_scheduler
+from utils.daily_stats import daily_stats
+from config.config import api_key, api_username, DISCORD_IMAGE, ACHIEVEMENT_EMBED_STYLE, ACHIEVEMENTS_CONCURRENCY, USER_TIMEOUT, OUTBOX_MAX_ATTEMPTS, RETROACHIEVEMENTS_INTERVAL, CURSOR_OVERLAP, CURSOR_MAX_CATCHUP_HOURS
 
 from utils.custom_logger import logger
 
+cursors = CursorStore()
+outbox = Outbox(max_attempts=OUTBOX_MAX_ATTEMPTS)
+
 async def process_achievements(users, api_username, api_key, achievements_channel, mastery_channel):
+    if circuit_breaker.is_open():
+        logger.warning(f'Skipping achievements cycle, RetroAchievements API is paused for {circuit_breaker.remaining():.0f} seconds')
+        return
     achievement_embeds = []
     mastery_embeds = []
-    for user in users:
+    semaphore = asyncio.Semaphore(ACHIEVEMENTS_CONCURRENCY)
+    # gather keeps the results in the order of users, so ties in the chronological sort stay deterministic
+    results = await asyncio.gather(*(process_user_achievements(user, api_username, api_key, semaphore) for user in users))
+    for user_achievement_embeds, user_mastery_embeds, _ in results:
+        achievement_embeds.extend(user_achievement_embeds)
+        mastery_embeds.extend(user_mastery_embeds)
+
+    # Store the embeds before anything is sent, once they are in the outbox the cursors can move on
+    outbox.add('achievements', achievement_embeds)
+    outbox.add('mastery', mastery_embeds)
+    outbox.flush()
+    for user, (_, _, poll) in zip(users, results):
+        if poll is not None:
+            cursors.advance(user, *poll)
+    cursors.save()
+
+    await send_pending_embeds(achievements_channel, mastery_channel)
+
+async def send_pending_embeds(achievements_channel, mastery_channel):
+    """
+    Sends every embed in the outbox, including the ones left over from before a crash or restart.
+    Embeds are marked done per message Discord accepted, so a failure or cancellation halfway
+    never posts the embeds that already went out a second time. The outbox is synced once,
+    after all sends, however they end.
+    """
+    try:
+        for send_embeds, name, channel in ((send_achievement_embeds, 'achievements', achievements_channel), (send_mastery_embeds, 'mastery', mastery_channel)):
+            embeds = outbox.pending(name)
+            if not embeds:
+                continue
+            try:
+                await send_embeds(embeds, channel)
+            except Exception as e:
+                logger.error(f'Error sending {name} embeds, {len(outbox.pending(name))} are kept in the outbox for the next cycle: {e}')
+    finally:
+        outbox.flush()
+
+def mark_sent(keys):
+    outbox.mark_done(keys)  # In memory only, send_pending_embeds flushes once per cycle
+
+def mark_rejected(key, error):
+    outbox.mark_failed(key, error)
+
+async def probe_idle_users(users, api_username, api_key):
+    """
+    Checks the profiles of idle users, a changed rich presence or last game puts them back on the minimum poll interval.
+    """
+    if circuit_breaker.is_open():
+        return
+    semaphore = asyncio.Semaphore(ACHIEVEMENTS_CONCURRENCY)
+
+    async def probe(user):
+        async with semaphore:
+            try:
+                profile = await UserProfile(user, api_username, api_key)
+            except Exception as e:
+                logger.error(f'Error checking the profile of idle user {user}: {e}')
+                return
+        poll_scheduler.observe_profile(user, profile.get_profile())
+
+    await asyncio.gather(*(probe(user) for user in users))
+
+async def process_user_achievements(user, api_username, api_key, semaphore):
+    achievement_embeds = []
+    mastery_embeds = []
+    async with semaphore:
         try:
-            user_completion = get_user_completion(user, api_username, api_key)
-            if user_completion.achievements:
-                profile, game_details, game_achievements = get_user_profile_and_achievements(user_completion)
-                mastery_count = -1
-                for game_id, achievements in game_achievements.items():
-                    game = game_details[game_id]
-                    process_game_achievements(game, user_completion, achievements, profile, achievement_embeds)
-                    if game.is_completed():
-                        mastery_count += 1
-                        process_game_mastery(game, user_completion, profile, mastery_embeds, mastery_count)
-            else:
-                logger.info(f'No achievements found for user {user}')
+            poll = await asyncio.wait_for(collect_user_embeds(user, api_username, api_key, achievement_embeds, mastery_embeds), timeout=USER_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.error(f'Timed out after {USER_TIMEOUT} seconds processing user {user}')
+            poll_scheduler.record_poll(user, None)
+            return [], [], None  # Drop partial results, the cursor is not moved so the user is retried next cycle
         except Exception as e:
             logger.error(f'Error processing user {user}: {e}')
-
-        logger.info(f'Finished fetching achievements for user {user}')
-
-    await send_achievement_embeds(achievement_embeds, achievements_channel)
-    await send_mastery_embeds(mastery_embeds, mastery_channel)
-
-def get_user_completion(user, api_username, api_key):
-    user_completion = UserCompletionRecent(user, api_username, api_key)
+            poll_scheduler.record_poll(user, None)
+            return [], [], None
+
+    handled, polled_until, active = poll
+    poll_scheduler.record_poll(user, active)
+    logger.info(f'Finished fetching achievements for user {user}')
+    return achievement_embeds, mastery_embeds, (handled, polled_until)
+
+async def collect_user_embeds(user, api_username, api_key, achievement_embeds, mastery_embeds):
+    """
+    Builds the embeds for the user's achievements since their cursor.
+
+    Returns:
+        tuple: The achievements that were handled, the epoch up to which polling is complete and whether the user was active.
+    """
+    user_completion, polled_until = await get_user_completion(user, api_username, api_key)
+    if not user_completion.achievements:
+        logger.info(f'No achievements found for user {user}')
+        return [], polled_until, False
+
+    profile, game_details, game_achievements, failed_achievements = await get_user_profile_and_achievements(user_completion)
+    poll_scheduler.observe_profile(user, profile.get_profile())
+    mastery_count = -1
+    progress = None
+    for game_id, achievements in game_achievements.items():
+        game = game_details[game_id]
+        await process_game_achievements(game, user_completion, achievements, profile, achievement_embeds)
+        if game.is_completed():
+            mastery_count += 1
+            if progress is None:  # Fetched once per user per cycle, however many games they mastered
+                progress = await fetch_all_progress(user, api_username, api_key)
+            await process_game_mastery(game, user_completion, profile, progress, mastery_embeds, mastery_count)
+
+    if failed_achievements:
+        # Hold the cursor just before the earliest failed achievement so it is fetched again next cycle
+        polled_until = min(polled_until, int(min(a.timestamp for a in failed_achievements).timestamp()) - 1)
+    handled = [a for achievements in game_achievements.values() for a in achievements]
+    return handled, polled_until, True
+
+async def get_user_completion(user, api_username, api_key):
+    now = int(time.time())
+    if (polled_until := cursors.polled_until(user)) is None:
+        # First poll for this user, fall back to the fixed recent window
+        user_completion = await UserCompletionRecent(user, api_username, api_key)
+        daily_stats.observe(user, user_completion.achievements, now - RETROACHIEVEMENTS_INTERVAL * 60, now)
+    else:
+        start = max(polled_until - CURSOR_OVERLAP, now - CURSOR_MAX_CATCHUP_HOURS * 3600)
+        if now - polled_until > RETROACHIEVEMENTS_INTERVAL * 60 * 2:
+            logger.info(f'Catching up {(now - start) // 60} minutes of achievements for user {user}')
+        user_completion = await UserCompletionByDate(user, api_username, api_key, start, now)
+        daily_stats.observe(user, user_completion.achievements, start, now)  # Before filtering, the daily overview counts everything in the window
+        # The window overlaps the previous one, skip everything that has already been posted
+        user_completion.achievements = [a for a in user_completion.achievements if not cursors.is_posted(user, a)]
     logger.info(f'Starting to get achievements for user {user}')
-    return user_completion
+    return user_completion, now
 
-def get_user_profile_and_achievements(user_completion):
-    profile = UserProfile(user_completion.user, api_username, api_key)
-    game_details, game_achievements = get_achievements(user_completion)
-    return profile, game_details, game_achievements
+async def get_user_profile_and_achievements(user_completion):
+    profile = await UserProfile(user_completion.user, api_username, api_key)
+    game_details, game_achievements, failed_achievements = await get_achievements(user_completion)
+    return profile, game_details, game_achievements, failed_achievements
 
-def get_game_details(game_id, username, api_username, api_key):
+async def get_game_details(game_id, username, api_username, api_key):
+    logger.info(f'Getting game progress details for game {game_id}')
     try:
-        return UserProgressGameInfo(
-            game_id, username, api_username, api_key
-        ).get_game()
+        game_info = await UserProgressGameInfo(game_id, username, api_username, api_key)
+        prewarm_game_colors(game_info.get_game())  # The embeds of this game find the icon color in flight or cached
+        return game_info.get_game()
     except Exception as e:
         logger.error(f'Error getting game progress details for game {game_id}: {e}')
 
-def get_achievements(user_completion):
+async def get_achievements(user_completion):
     try:
         achievements = user_completion.get_achievements()
-        game_ids = set()
         game_details = {}
         game_achievements = {}
+        failed_achievements = []
 
         for achievement in achievements:
-            game_ids.add(achievement.game_id)
             logger.info(f"{user_completion.user} has earned an achievement: {achievement.title} ({achievement.points}) ({achievement.retropoints}) for {achievement.game_title}")
             if achievement.game_id not in game_achievements:
                 game_achievements[achievement.game_id] = []
             game_achievements[achievement.game_id].append(achievement)
 
+        game_ids = list(game_achievements)
         logger.debug(f'Found {len(game_ids)} unique game IDs in achievements')
 
-        for game_id in game_ids:
-            logger.info(f'Getting game progress details for game {game_id}')
-            game = get_game_details(game_id, user_completion.user, api_username, api_key)
+        games = await asyncio.gather(*(get_game_details(game_id, user_completion.user, api_username, api_key) for game_id in game_ids))
+        for game_id, game in zip(game_ids, games):
+            if game is None:
+                # Skip this game but keep the others, its achievements are retried next cycle
+                logger.warning(f'Skipping {len(game_achievements[game_id])} achievements for game {game_id}, will retry next cycle')
+                failed_achievements.extend(game_achievements.pop(game_id))
+                continue
             game_details[game_id] = game
             logger.info(f'Got game progress details for game {game_id}')
 
-        return game_details, game_achievements
+        return game_details, game_achievements, failed_achievements
     except Exception as e:
         logger.error(f'Error getting achievements for user {user_completion.user}: {e}')
 
-def process_game_achievements(game, user_completion, achievements, profile, achievement_embeds):
-    achievements.sort(key=lambda x: datetime.strptime(x.date, "%Y-%m-%d %H:%M:%S"))
+async def process_game_achievements(game, user_completion, achievements, profile, achievement_embeds):
+    achievements.sort(key=lambda x: x.timestamp)
     for i, achievement in enumerate(achievements):
-        embed = create_achievement_embed(game, user_completion.user, achievement, profile, i+1, len(achievements))
-        achievement_embeds.append((datetime.strptime(achievement.date, "%Y-%m-%d %H:%M:%S"), embed))
+        embed = await create_achievement_embed(game, user_completion.user, achievement, profile, i+1, len(achievements))
+        achievement_embeds.append((achievement.timestamp, embed, f"{user_completion.user}:{CursorStore.key(achievement)}"))
 
-def process_game_mastery(game, user_completion, profile, mastery_embeds, mastery_count):
-    user_progress = UserCompletionProgress(user_completion.user, api_username, api_key)
-    game_unlocks = GameUnlocks(api_username, api_key, game.id)
-    unlock_distribution = game_unlocks.get_distribution()
+async def process_game_mastery(game, user_completion, profile, progress, mastery_embeds, mastery_count):
+    unlock_distribution = await distribution_cache.get(game.id, api_username, api_key)  # One fetch per game, however many users master it
+    if game_progress := progress.get_result(game.id):
+        distribution_cache.add_mastery(game.id, user_completion.user, game.total_achievements, game_progress.highest_award_timestamp)
     highest_unlock = unlock_distribution.get_highest_unlock()
-    progress = user_progress.get_progress()
     mastered_count = ordinal(int(progress.count_mastered()) - mastery_count)
     mastery_time = game.days_since_last_achievement()
     mastery_percentage = round((highest_unlock / game.total_players_hardcore) * 100, 2)
-    if game_progress := next(
-        (result for result in progress.results if result.game_id == game.id),
-        None,
-    ):
+    if game_progress:
         logger.info(f"{user_completion.user} has mastered {game.title}! {game.total_achievements} achievements have been earned in {mastery_time}! {highest_unlock} out of {game.total_players_hardcore} players have mastered the game! ({mastery_percentage}%)")
-        mastery_embed = create_mastery_embed(game, user_completion.user, profile, game_progress, mastered_count, mastery_time, highest_unlock, mastery_percentage)
-        mastery_embeds.append((datetime.strptime(game_progress.highest_award_date, "%Y-%m-%dT%H:%M:%S%z"), mastery_embed))
+        mastery_embed = await create_mastery_embed(game, user_completion.user, profile, game_progress, mastered_count, mastery_time, highest_unlock, mastery_percentage)
+        mastery_embeds.append((game_progress.highest_award_timestamp, mastery_embed, f"{user_completion.user}:mastery:{game.id}"))
         
 # Embed creation wrapper function
-def create_achievement_embed(game, user, achievement, profile, current, total):
+async def create_achievement_embed(game, user, achievement, profile, current, total):
     if ACHIEVEMENT_EMBED_STYLE == 1:
-        return create_achievement_embed_v1(game, user, achievement, profile, current, total)
+        return await create_achievement_embed_v1(game, user, achievement, profile, current, total)
     elif ACHIEVEMENT_EMBED_STYLE == 2:
-        return create_achievement_embed_v2(game, user, achievement, profile, current, total)
+        return await create_achievement_embed_v2(game, user, achievement, profile, current, total)
     else:
         raise ValueError("Invalid ACHIEVEMENT_EMBED configuration value")
 
 # First style of achievement embed
-def create_achievement_embed_v1(game, user, achievement, profile, current, total):
+async def create_achievement_embed_v1(game, user, achievement, profile, current, total):
     if achievement.mode == "Hardcore":
         completion = game.total_achievements_earned_hardcore - total + current
     else:  # Assuming 'softcore' as the default else case
         completion = game.total_achievements_earned_softcore - total + current
 
     percentage = (completion / game.total_achievements) * 100
-    unlock_percentage = (game.achievements[achievement.title]['NumAwardedHardcore'] / game.total_players_hardcore) * 100 if game.total_players_hardcore else 0
-    most_common_color = get_discord_color(achievement.game_icon)
+    unlock_percentage = game.unlock_percentage(achievement.achievement_id)
+    most_common_color = await get_discord_color(achievement.game_icon)
 
-    # Load emoji mappings
-    with open('emoji.json') as f:
-        emoji_mappings = json.load(f)
-    # Get the emoji ID based on console name, with a general emoji if no specific match is found
-    console_name = game.remap_console_name()
-    emoji_id = emoji_mappings.get(console_name.lower())
-    emoji = f"<:{console_name}:{emoji_id}>" if emoji_id else ":video_game:"
+    emoji = emoji_registry.get(game.console_name, game.console_id)
 
     embed = discord.Embed(
         description=(
             f"**[{achievement.game_title}]({achievement.game_url})** "
             f"{emoji}\n\n"
             f"{achievement.description}\n\n"
-            f"Unlocked by **{game.achievements[achievement.title]['NumAwardedHardcore']}** out of "
+            f"Unlocked by **{game.num_awarded_hardcore(achievement.achievement_id)}** out of "
             f"**{game.total_players_hardcore}** players (**{unlock_percentage:.2f}%**)"
         ),
         color=most_common_color
@@ -157,23 +268,17 @@ def create_achievement_embed_v1(game, user, achievement, profile, current, total
     return embed
 
 # Second style of achievement embed
-def create_achievement_embed_v2(game, user, achievement, profile, current, total):
+async def create_achievement_embed_v2(game, user, achievement, profile, current, total):
     if achievement.mode == "Hardcore":
         completion = game.total_achievements_earned_hardcore - total + current
     else:  # Assuming 'softcore' as the default else case
         completion = game.total_achievements_earned_softcore - total + current
 
     percentage = (completion / game.total_achievements) * 100
-    unlock_percentage = (game.achievements[achievement.title]['NumAwardedHardcore'] / game.total_players_hardcore) * 100 if game.total_players_hardcore else 0
-    most_common_color = get_discord_color(achievement.game_icon)
-
-    # Load emoji mappings
-    with open('emoji.json') as f:
-        emoji_mappings = json.load(f)
-    # Get the emoji ID based on console name, with a general emoji if no specific match is found
-    console_name = game.remap_console_name()
-    emoji_id = emoji_mappings.get(console_name.lower())
-    emoji = f"<:{console_name}:{emoji_id}>" if emoji_id else ":video_game:"
+    unlock_percentage = game.unlock_percentage(achievement.achievement_id)
+    most_common_color = await get_discord_color(achievement.game_icon)
+
+    emoji = emoji_registry.get(game.console_name, game.console_id)
     
     # Check if achievement type is 'Missable'
     achievement_title = (
@@ -202,16 +307,10 @@ def create_achievement_embed_v2(game, user, achievement, profile, current, total
     embed.set_author(name="Achievement unlocked", icon_url=achievement.game_icon)
     return embed
 
-def create_mastery_embed(game, user, profile, game_progress, mastered_count, mastery_time, highest_unlock, mastery_percentage):
-    most_common_color = get_discord_color(game.image_icon)
+async def create_mastery_embed(game, user, profile, game_progress, mastered_count, mastery_time, highest_unlock, mastery_percentage):
+    most_common_color = await get_discord_color(game.image_icon)
     
-    # Load emoji mappings
-    with open('emoji.json') as f:
-        emoji_mappings = json.load(f)
-    # Get the emoji ID based on console name, with a general emoji if no specific match is found
-    console_name = game.remap_console_name()
-    emoji_id = emoji_mappings.get(console_name.lower())
-    emoji = f"<:{console_name}:{emoji_id}>" if emoji_id else ":video_game:"
+    emoji = emoji_registry.get(game.console_name, game.console_id)
 
     embed = discord.Embed(
         description=(
@@ -242,12 +341,10 @@ async def send_achievement_embeds(achievement_embeds, achievements_channel):
     achievement_embeds.sort(key=lambda x: x[0])
     if achievement_embeds:
         logger.info(f"Sending {len(achievement_embeds)} embeds to {achievements_channel}")
-        for embed in achievement_embeds:
-            await achievements_channel.send(embed=embed[1])  # Send each embed individually
+        await dispatcher.send(achievements_channel, [embed[1] for embed in achievement_embeds], [embed[2] for embed in achievement_embeds], mark_sent, mark_rejected)  # Up to 10 embeds per message, in chronological order
 
 async def send_mastery_embeds(mastery_embeds, mastery_channel):
     mastery_embeds.sort(key=lambda x: x[0])
     if mastery_embeds:
         logger.info(f"Sending {len(mastery_embeds)} mastery embeds to {mastery_channel}")
-        for embed in mastery_embeds:
-            await mastery_channel.send(embed=embed[1])  # Send each embed individually
\ No newline at end of file
+        await dispatcher.send(mastery_channel, [embed[1] for embed in mastery_embeds], [embed[2] for embed in mastery_embeds], mark_sent, mark_rejected)
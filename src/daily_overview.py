@@ -1,72 +1,55 @@
+import asyncio
 import discord
 
 from services.api import UserCompletionByDate, UserProfile
+from services.dispatch import dispatcher
 from utils.image import get_discord_color
 from utils.datetime import get_now_and_yesterday_epoch
-from config.config import DISCORD_IMAGE, RETRO_DAILY_IMAGE
+from utils.daily_stats import daily_stats
+from config.config import DISCORD_IMAGE, RETRO_DAILY_IMAGE, CURSOR_OVERLAP
 from utils.custom_logger import logger
 
 def format_points(points):
     return format(points, ',').replace(',', '.') if points >= 10000 else str(points)
 
 async def process_daily_overview(users, api_username, api_key, channel):
-    all_embeds = []
-    for user in users:
-        try:
-            yesterday, now = get_now_and_yesterday_epoch()
-            user_completion = UserCompletionByDate(user, api_username, api_key, yesterday, now)
-            profile = UserProfile(user, api_username, api_key)
-            achievements = user_completion.get_achievements()
-            if achievements:  # Only process if there are achievements
-                achievement_count, daily_hardcore_points, daily_softcore_points, daily_retropoints = count_daily_points(achievements)
-                max_achievement = find_max_achievement(achievements)
-                fav_game_details = favorite_game(achievements)
-                logger.info(f"{user} has earned {achievement_count} achievements today, totaling {daily_hardcore_points} Hardcore points, {daily_softcore_points} Softcore points and {daily_retropoints} RetroPoints. Their favorite game is {fav_game_details[0]} with {fav_game_details[1]} achievements.")
-                embed = create_embed(profile, daily_hardcore_points, daily_softcore_points, daily_retropoints, max_achievement, *fav_game_details, achievements)
-                all_embeds.append(embed)
-        except Exception as e:
-            logger.error(f'Error processing user {user}: {e}')
+    yesterday, now = get_now_and_yesterday_epoch()
+    # The totals are already in memory, only unpolled stretches and profiles are fetched, for every user at once
+    results = await asyncio.gather(*(create_user_overview(user, api_username, api_key, yesterday, now) for user in users))
+    all_embeds = [embed for embed in results if embed is not None]
 
     if all_embeds:
         logger.info(f"Sending {len(all_embeds)} embeds to {channel}")
-        for i in range(0, len(all_embeds), 10):
-            await channel.send(embeds=all_embeds[i:i+10])
-
-def count_daily_points(achievements):
-    achievement_count = len(achievements) if achievements else 0
-
-    daily_hardcore_points = sum(a.points for a in achievements if a.mode == "Hardcore") if achievements else 0
-    daily_softcore_points = sum(a.points for a in achievements if a.mode == "Softcore") if achievements else 0
-    daily_retropoints = sum(a.retropoints for a in achievements if a.mode == "Hardcore") if achievements else 0  # No RetroPoints for Softcore
-
-    return (
-        achievement_count,
-        format_points(daily_hardcore_points),
-        format_points(daily_softcore_points),
-        format_points(daily_retropoints)
-    )
-
-def find_max_achievement(achievements):
-    return max(achievements, key=lambda achievement: (achievement.points, achievement.retropoints), default=None)
-
-def favorite_game(achievements):
-    game_counts = {}
-    for achievement in achievements:
-        game = game_counts.setdefault(achievement.game_title, [0, achievement.game_url, achievement.remap_console_name(), 0, 0])
-        game[0] += 1
-        game[3] += achievement.points
-        game[4] += achievement.retropoints
-    if game_counts:
-        return extract_favorite_game(game_counts)
-    return None, None, None, None, None, None
-
-def extract_favorite_game(game_counts):
-    favorite_game = max(game_counts, key=lambda x: game_counts[x][0])
-    fav_details = game_counts[favorite_game]
-    return favorite_game, fav_details[0], fav_details[1], fav_details[2], format_points(fav_details[3]), format_points(fav_details[4])
-
-def create_embed(profile, daily_hardcore_points, daily_softcore_points, daily_retropoints, max_achievement, fav_game, fav_game_achievements, fav_url, fav_console_name, fav_game_points, fav_game_retropoints, achievements):
-    embed_color = get_discord_color(max_achievement.badge_url if max_achievement else profile.profile.user_pic_unique)
+        await dispatcher.send(channel, all_embeds)
+
+async def create_user_overview(user, api_username, api_key, yesterday, now):
+    try:
+        await reconcile_daily_stats(user, api_username, api_key, yesterday, now)
+        day = daily_stats.day(user, yesterday)
+        if day is None:  # Only process if there are achievements
+            return None
+        profile = await UserProfile(user, api_username, api_key)
+        totals = day.totals
+        daily_hardcore_points, daily_softcore_points, daily_retropoints = (format_points(points) for points in (totals.points["Hardcore"], totals.points["Softcore"], totals.retropoints))
+        fav_game_details = extract_favorite_game(totals)
+        logger.info(f"{user} has earned {len(totals)} achievements today, totaling {daily_hardcore_points} Hardcore points, {daily_softcore_points} Softcore points and {daily_retropoints} RetroPoints. Their favorite game is {fav_game_details[0]} with {fav_game_details[1]} achievements.")
+        return await create_embed(profile, daily_hardcore_points, daily_softcore_points, daily_retropoints, totals.top, *fav_game_details, totals.counts["Hardcore"], totals.counts["Softcore"])
+    except Exception as e:
+        logger.error(f'Error processing user {user}: {e}')
+
+async def reconcile_daily_stats(user, api_username, api_key, yesterday, now):
+    # Fetch only what the achievements poller has not seen, usually just the minutes since its last poll
+    for start, end in daily_stats.gaps(user, yesterday, now):
+        logger.info(f"Fetching {(end - start) // 60} minutes of achievements for {user} that were not polled")
+        user_completion = await UserCompletionByDate(user, api_username, api_key, max(yesterday, start - CURSOR_OVERLAP), end)
+        daily_stats.observe(user, user_completion.get_achievements(), start, end)
+
+def extract_favorite_game(totals):
+    count, points, retropoints, title, url, console_name = totals.favorite_game()
+    return title, count, url, console_name, format_points(points), format_points(retropoints)
+
+async def create_embed(profile, daily_hardcore_points, daily_softcore_points, daily_retropoints, max_achievement, fav_game, fav_game_achievements, fav_url, fav_console_name, fav_game_points, fav_game_retropoints, hardcore_count, softcore_count):
+    embed_color = await get_discord_color(max_achievement.badge_url if max_achievement else profile.profile.user_pic_unique)
     embed = discord.Embed(title='', description='', color=embed_color).set_footer(
         text=f"Hardcore Points: {profile.profile.total_points_format} • Softcore Points: {profile.profile.total_softcore_points} • Retro Points: {profile.profile.total_true_points_format}",
         icon_url=profile.profile.user_pic_unique
@@ -77,9 +60,6 @@ def create_embed(profile, daily_hardcore_points, daily_softcore_points, daily_re
         url=DISCORD_IMAGE
     )
     if max_achievement:
-        hardcore_count = sum(1 for a in achievements if a.mode == "Hardcore")
-        softcore_count = sum(1 for a in achievements if a.mode == "Softcore")
-
         achievement_mode_text = f"[{profile.profile.user}]({profile.profile.user_url}) has earned "
         if hardcore_count > 0 and softcore_count > 0:
             achievement_mode_text += f"{softcore_count} softcore achievement{'s' if softcore_count != 1 else ''} and {hardcore_count} hardcore achievement{'s' if hardcore_count != 1 else ''} today.\n\n"
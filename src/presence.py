@@ -1,7 +1,8 @@
 import discord
 import json
 import random
-from services.api import UserProfile, GameDetails
+from services.api import UserProfile, GameDetails, circuit_breaker
+from utils.scheduler import poll_scheduler
 from utils.custom_logger import logger
 
 async def process_presence(bot, user, api_username, api_key):
@@ -22,13 +23,17 @@ async def process_presence(bot, user, api_username, api_key):
     Examples:
         await process_presence(bot_instance, user_instance, 'api_username', 'api_key')
     """
+    if circuit_breaker.is_open():
+        logger.warning(f'Skipping presence for {user}, RetroAchievements API is paused')
+        return
     try:
         # Fetch user profile and last game played
-        user_profile = UserProfile(user, api_username, api_key)
+        user_profile = await UserProfile(user, api_username, api_key)
         profile = user_profile.get_profile()
         last_game_id = profile.last_game_id
+        poll_scheduler.observe_profile(user, profile)  # A changed rich presence means the user is playing, poll them sooner
 
-        def get_or_fetch_game(game_id):
+        async def get_or_fetch_game(game_id):
             try:
                 with open('games.json', 'r') as f:
                     games = json.load(f)
@@ -38,7 +43,7 @@ async def process_presence(bot, user, api_username, api_key):
             # If the game is not in games.json, fetch and add it
             if str(game_id) not in games:
                 logger.info(f"Fetching game ID {game_id} from API.")
-                game_details = GameDetails(game_id, api_username, api_key)
+                game_details = await GameDetails(game_id, api_username, api_key)
                 game = game_details.get_game()
                 games[str(game_id)] = {"title": game.title, "platform": game.remap_console_name()}
                 
@@ -51,7 +56,7 @@ async def process_presence(bot, user, api_username, api_key):
             return games
 
         # Fetch or add the last played game to games.json
-        games = get_or_fetch_game(last_game_id)
+        games = await get_or_fetch_game(last_game_id)
 
         # Pick a random game from the updated games.json
         random_game_id = random.choice(list(games.keys()))
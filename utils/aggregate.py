@@ -0,0 +1,116 @@
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+from utils.datetime import get_timezone
+
+MODES = ("Hardcore", "Softcore")
+
+class UnlockAggregate:
+    """
+    Every overview metric of a set of unlocks, computed in a single pass.
+
+    Each unlock is visited once: it updates the counts and points per mode, the RetroPoints
+    (only earned in hardcore), one row of the per-game table and the top achievement. Unlocks
+    can be removed again, which keeps a sliding window up to date without recounting it.
+
+    The per-game table maps a game ID to [count, points, retropoints, title, url, console name].
+    """
+    def __init__(self):
+        self.counts = dict.fromkeys(MODES, 0)
+        self.points = dict.fromkeys(MODES, 0)
+        self.retropoints = 0
+        self.games = {}
+        self.top = None
+        self.top_rank = None
+
+    def __len__(self) -> int:
+        return self.counts["Hardcore"] + self.counts["Softcore"]
+
+    @staticmethod
+    def rank(achievement, epoch: int) -> tuple:
+        return achievement.points, achievement.retropoints, -epoch  # Ties go to the earliest unlock
+
+    def add(self, achievement, epoch: int) -> None:
+        mode = achievement.mode
+        self.counts[mode] += 1
+        self.points[mode] += achievement.points
+        if mode == "Hardcore":
+            self.retropoints += achievement.retropoints
+        game = self.games.get(achievement.game_id)
+        if game is None:
+            game = self.games[achievement.game_id] = [0, 0, 0, achievement.game_title, achievement.game_url, achievement.remap_console_name()]
+        game[0] += 1
+        game[1] += achievement.points
+        game[2] += achievement.retropoints
+        rank = self.rank(achievement, epoch)
+        if self.top_rank is None or rank > self.top_rank:
+            self.top, self.top_rank = achievement, rank
+
+    def remove(self, achievement, epoch: int) -> bool:
+        """
+        Takes an unlock out of the totals.
+
+        Returns:
+            bool: True when it was the top achievement, which then has to be found again with `find_top`.
+        """
+        mode = achievement.mode
+        self.counts[mode] -= 1
+        self.points[mode] -= achievement.points
+        if mode == "Hardcore":
+            self.retropoints -= achievement.retropoints
+        game = self.games[achievement.game_id]
+        game[0] -= 1
+        game[1] -= achievement.points
+        game[2] -= achievement.retropoints
+        if game[0] == 0:
+            del self.games[achievement.game_id]
+        if achievement is self.top:
+            self.top, self.top_rank = None, None
+            return True
+        return False
+
+    def find_top(self, unlocks: Iterable[Tuple[int, object]]) -> None:
+        for epoch, achievement in unlocks:
+            rank = self.rank(achievement, epoch)
+            if self.top_rank is None or rank > self.top_rank:
+                self.top, self.top_rank = achievement, rank
+
+    def favorite_game(self) -> Optional[list]:
+        """
+        Returns the per-game row of the game with the most unlocks, the first one seen on a tie.
+        """
+        return max(self.games.values(), key=lambda game: game[0], default=None)
+
+def aggregate(unlocks: Iterable[Tuple[int, object]]) -> UnlockAggregate:
+    """
+    Aggregates (epoch, achievement) pairs in a single pass.
+    """
+    totals = UnlockAggregate()
+    for epoch, achievement in unlocks:
+        totals.add(achievement, epoch)
+    return totals
+
+def rollup(unlocks: Iterable[Tuple[int, object]], period: str, timezone: Optional[str] = None) -> dict:
+    """
+    Aggregates (epoch, achievement) pairs per week or month, still in a single pass.
+
+    Args:
+        unlocks (Iterable): The (epoch, achievement) pairs, in any order.
+        period (str): 'week' for ISO weeks or 'month' for calendar months.
+        timezone (str): The timezone the periods start and end in, the configured TIMEZONE by default.
+
+    Returns:
+        dict: The period, (year, week) or (year, month), to its UnlockAggregate, in chronological order.
+    """
+    if period not in ('week', 'month'):
+        raise ValueError("period must be 'week' or 'month'")
+    zone = get_timezone(timezone) if timezone else get_timezone()
+    periods = {}
+    for epoch, achievement in unlocks:
+        date = datetime.fromtimestamp(epoch, zone)
+        key = date.isocalendar()[:2] if period == 'week' else (date.year, date.month)
+        totals = periods.get(key)
+        if totals is None:
+            totals = periods[key] = UnlockAggregate()
+        totals.add(achievement, epoch)
+    return dict(sorted(periods.items()))
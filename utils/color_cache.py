@@ -0,0 +1,121 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from utils.custom_logger import logger
+
+class ColorCache:
+    """
+    Cache of image URL to Discord color, kept in memory and persisted to SQLite.
+
+    Every color is loaded into memory once, so lookups never touch the disk. New colors and
+    lookups are written behind in batches: after `flush_every` changes, after `flush_interval`
+    seconds or when the process exits. Each batch is a single SQLite transaction, so a crash
+    loses at most the unflushed colors and never corrupts the store. Once more than
+    `max_entries` colors are cached, the least recently used ones are evicted.
+
+    Args:
+        path (str): Path to the SQLite database.
+        max_entries (int): Maximum number of cached colors.
+        flush_every (int): Number of pending changes that triggers a write.
+        flush_interval (float): Maximum number of seconds changes stay pending.
+        legacy_file (str): Old JSON cache that is imported once when the database is empty.
+    """
+    def __init__(self, path: str = 'image_cache.db', max_entries: int = 5000, flush_every: int = 20, flush_interval: float = 60, legacy_file: str = 'image_cache.json'):
+        self.path = path
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.colors = OrderedDict()  # Least recently used first
+        self.pending = {}
+        self.evicted = set()
+        self.last_flush = time.monotonic()
+        self.lock = threading.RLock()  # Colors are computed in worker threads
+        self.connection = None
+        self.legacy_file = legacy_file
+
+    def open(self) -> None:
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS colors (url TEXT PRIMARY KEY, color INTEGER NOT NULL, last_used REAL NOT NULL)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS colors_last_used ON colors (last_used)')
+        self.connection.commit()
+        for url, color in self.connection.execute('SELECT url, color FROM colors ORDER BY last_used'):
+            self.colors[url] = color
+        if not self.colors:
+            self.import_legacy()
+        atexit.register(self.flush)
+        logger.debug(f'Loaded {len(self.colors)} cached colors from {self.path}')
+
+    def import_legacy(self) -> None:
+        if not os.path.exists(self.legacy_file):
+            return
+        try:
+            with open(self.legacy_file, 'r') as f:
+                legacy = json.load(f)
+        except json.JSONDecodeError as e:
+            logger.error(f'Error reading {self.legacy_file}, not importing it: {e}')
+            return
+        now = time.time()
+        self.colors.update(legacy)
+        self.pending.update((url, (color, now)) for url, color in legacy.items())
+        while len(self.colors) > self.max_entries:
+            evicted_url, _ = self.colors.popitem(last=False)
+            self.pending.pop(evicted_url, None)
+        self.flush()
+        logger.info(f'Imported {len(legacy)} colors from {self.legacy_file}')
+
+    def __contains__(self, url: str) -> bool:
+        with self.lock:
+            if self.connection is None:
+                self.open()
+            return url in self.colors
+
+    def get(self, url: str) -> Optional[int]:
+        with self.lock:
+            if self.connection is None:
+                self.open()
+            color = self.colors.get(url)
+            if color is not None:
+                self.colors.move_to_end(url)
+                self.pending[url] = (color, time.time())  # Only to record the lookup time for eviction
+        return color
+
+    def set(self, url: str, color: int) -> None:
+        with self.lock:
+            if self.connection is None:
+                self.open()
+            self.colors[url] = color
+            self.colors.move_to_end(url)
+            self.pending[url] = (color, time.time())
+            self.evicted.discard(url)
+            while len(self.colors) > self.max_entries:
+                evicted_url, _ = self.colors.popitem(last=False)
+                self.pending.pop(evicted_url, None)
+                self.evicted.add(evicted_url)
+            if len(self.pending) >= self.flush_every or time.monotonic() - self.last_flush >= self.flush_interval:
+                self.flush()
+
+    def flush(self) -> None:
+        with self.lock:
+            if self.connection is None or (not self.pending and not self.evicted):
+                return
+            try:
+                with self.connection:  # One transaction for the whole batch
+                    self.connection.executemany(
+                        'INSERT INTO colors (url, color, last_used) VALUES (?, ?, ?) ON CONFLICT(url) DO UPDATE SET color = excluded.color, last_used = excluded.last_used',
+                        [(url, color, last_used) for url, (color, last_used) in self.pending.items()]
+                    )
+                    self.connection.executemany('DELETE FROM colors WHERE url = ?', [(url,) for url in self.evicted])
+            except sqlite3.Error as e:
+                logger.error(f'Error writing colors to {self.path}: {e}')
+                return
+            self.pending.clear()
+            self.evicted.clear()
+            self.last_flush = time.monotonic()
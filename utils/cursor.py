@@ -0,0 +1,81 @@
+import json
+import os
+from typing import Iterable, Optional
+
+from utils.custom_logger import logger
+
+class CursorStore:
+    """
+    Persistent per-user high-water marks for achievement polling.
+
+    For every user it stores the last posted achievement (ID and date), the epoch up to which
+    polling is known to be complete and the keys of the most recently posted achievements.
+    An achievement key is its ID plus its mode, so a softcore unlock that is later earned in
+    hardcore is still posted once for each mode, but never twice for the same one.
+
+    Args:
+        path (str): Path to the JSON file the cursors are stored in.
+        max_posted (int): Number of posted achievement keys to remember per user.
+    """
+    def __init__(self, path: str = 'cursors.json', max_posted: int = 500):
+        self.path = path
+        self.max_posted = max_posted
+        self.cursors = {}
+        self.posted = {}
+        self.load()
+
+    def load(self) -> None:
+        try:
+            with open(self.path, 'r') as f:
+                self.cursors = json.load(f)
+        except FileNotFoundError:
+            self.cursors = {}
+        except json.JSONDecodeError as e:
+            logger.error(f'Error reading {self.path}, starting without cursors: {e}')
+            self.cursors = {}
+        self.posted = {user: set(cursor.get('posted', [])) for user, cursor in self.cursors.items()}
+
+    def save(self) -> None:
+        # Write to a temporary file first so a crash never leaves a half-written cursor file
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.cursors, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+    def polled_until(self, user: str) -> Optional[int]:
+        cursor = self.cursors.get(user)
+        return cursor.get('polled_until') if cursor else None
+
+    @staticmethod
+    def key(achievement) -> str:
+        return f"{achievement.achievement_id}:{achievement.mode}"
+
+    def is_posted(self, user: str, achievement) -> bool:
+        return self.key(achievement) in self.posted.get(user, ())
+
+    def advance(self, user: str, achievements: Iterable, polled_until: int) -> None:
+        """
+        Marks the achievements as posted and moves the user's high-water mark.
+
+        Args:
+            user (str): The user the achievements belong to.
+            achievements (Iterable): The achievements that have been posted.
+            polled_until (int): Epoch up to which every achievement has been handled.
+        """
+        cursor = self.cursors.setdefault(user, {'date': None, 'last_id': None, 'posted': [], 'polled_until': None})
+        posted = self.posted.setdefault(user, set())
+        for achievement in sorted(achievements, key=lambda a: a.date):
+            key = self.key(achievement)
+            if key in posted:
+                continue
+            posted.add(key)
+            cursor['posted'].append(key)
+            if cursor['date'] is None or achievement.date >= cursor['date']:
+                cursor['date'], cursor['last_id'] = achievement.date, achievement.achievement_id
+        if len(cursor['posted']) > self.max_posted:
+            for key in cursor['posted'][:-self.max_posted]:
+                posted.discard(key)
+            cursor['posted'] = cursor['posted'][-self.max_posted:]
+        cursor['polled_until'] = polled_until
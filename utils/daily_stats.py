@@ -0,0 +1,109 @@
+from typing import Iterable, List, Optional, Tuple
+
+from utils.aggregate import UnlockAggregate
+from utils.cursor import CursorStore
+from utils.custom_logger import logger
+
+class UserDay:
+    """
+    Running totals of one user's unlocks over the last day.
+
+    Every unlock is added once as it is observed and removed again once it falls out of the
+    window, so the totals are always ready and never recounted.
+    """
+    def __init__(self):
+        self.unlocks = {}  # Achievement key to (epoch, achievement)
+        self.totals = UnlockAggregate()
+        self.coverage = []  # Sorted, non-overlapping [start, end] epochs that have been polled
+
+    def add(self, key: str, epoch: int, achievement) -> None:
+        if key in self.unlocks:
+            return
+        self.unlocks[key] = (epoch, achievement)
+        self.totals.add(achievement, epoch)
+
+    def remove(self, key: str) -> None:
+        epoch, achievement = self.unlocks.pop(key)
+        if self.totals.remove(achievement, epoch):
+            self.totals.find_top(self.unlocks.values())
+
+    def cover(self, start: int, end: int) -> None:
+        merged = []
+        for interval in sorted(self.coverage + [[start, end]]):
+            if merged and interval[0] <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], interval[1])
+            else:
+                merged.append(list(interval))
+        self.coverage = merged
+
+    def prune(self, before: int) -> None:
+        for key in [key for key, (epoch, _) in self.unlocks.items() if epoch < before]:
+            self.remove(key)
+        self.coverage = [[max(start, before), end] for start, end in self.coverage if end > before]
+
+class DailyStats:
+    """
+    Daily overview statistics, kept up to date from the unlocks the achievements poller sees.
+
+    The poller reports every achievements response together with the time window it covers.
+    The unlocks are added to running per-user totals and the windows are merged into a coverage
+    list, so at midnight the overview can be assembled from memory and only the stretches that
+    were never polled (downtime, failed polls, the tail since the last poll) need the API.
+
+    Args:
+        window (int): Number of seconds of unlocks and coverage to keep.
+    """
+    def __init__(self, window: int = 26 * 3600):
+        self.window = window
+        self.users = {}
+
+    def observe(self, user: str, achievements: Iterable, start: int, end: int) -> None:
+        """
+        Adds the unlocks of an achievements response.
+
+        Args:
+            user (str): The user the achievements belong to.
+            achievements (Iterable): Every achievement in the response, duplicates are ignored.
+            start (int): Epoch the response starts at.
+            end (int): Epoch the response ends at.
+        """
+        day = self.users.setdefault(user, UserDay())
+        day.prune(end - self.window)
+        for achievement in achievements:
+            try:
+                epoch = int(achievement.timestamp.timestamp())
+            except (AttributeError, ValueError):
+                logger.warning(f'Not counting achievement {achievement.achievement_id} of {user} in the daily overview, it has no valid date')
+                continue
+            if epoch >= end - self.window:
+                day.add(CursorStore.key(achievement), epoch, achievement)
+        day.cover(start, end)
+
+    def gaps(self, user: str, start: int, end: int) -> List[Tuple[int, int]]:
+        """
+        Returns the parts of [start, end] that no observed response covered.
+        """
+        gaps = []
+        for covered_start, covered_end in self.users.get(user, UserDay()).coverage:
+            if covered_end <= start:
+                continue
+            if covered_start > start:
+                gaps.append((start, min(covered_start, end)))
+            start = max(start, covered_end)
+            if start >= end:
+                break
+        if start < end:
+            gaps.append((start, end))
+        return gaps
+
+    def day(self, user: str, start: int) -> Optional[UserDay]:
+        """
+        Returns the user's totals for the unlocks since `start`, or None if they have none.
+        """
+        day = self.users.get(user)
+        if day is None:
+            return None
+        day.prune(start)
+        return day if day.unlocks else None
+
+daily_stats = DailyStats()
@@ -1,20 +1,55 @@
-import pytz
-from datetime import datetime, timedelta
-from config.config import RETROACHIEVEMENTS_INTERVAL, PRESENCE_INTERVAL
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional
+from zoneinfo import ZoneInfo
+from config.config import RETROACHIEVEMENTS_INTERVAL, PRESENCE_INTERVAL, TIMEZONE
+
+@lru_cache(maxsize=None)
+def get_timezone(name: str = TIMEZONE) -> ZoneInfo:
+    """
+    A function to get a timezone, loaded once per name.
+
+    Args:
+    - name: The IANA name of the timezone, the configured TIMEZONE by default.
+
+    Returns:
+    The ZoneInfo of the timezone.
+    """
+    return ZoneInfo(name)
+
+def parse_api_date(date_str: str) -> datetime:
+    """
+    A function to parse a RetroAchievements date into a timezone-aware datetime.
+
+    Both formats of the API are accepted: '%Y-%m-%d %H:%M:%S' (UTC) and ISO 8601 with an offset,
+    for example '2024-05-01T10:00:00+00:00'.
+
+    Args:
+    - date_str: String representing the date.
+
+    Returns:
+    The datetime, in UTC when the string has no offset.
+    """
+    date = datetime.fromisoformat(date_str.replace('Z', '+00:00'))  # fromisoformat is a C parser, many times faster than strptime
+    return date if date.tzinfo is not None else date.replace(tzinfo=timezone.utc)
+
+def format_local(date: Optional[datetime], format_str: str) -> Optional[str]:
+    """
+    A function to format a timezone-aware datetime in the configured timezone.
+    """
+    return date.astimezone(get_timezone()).strftime(format_str) if date is not None else None
 
 def get_now_and_yesterday_epoch():
     """
-    A function to get the epoch time of yesterday and now in the Europe/Amsterdam timezone.
+    A function to get the epoch time of yesterday and now in the configured timezone.
 
     Returns:
     Tuple of two integers representing the epoch time of yesterday and now.
     """
-    now_utc = datetime.now(pytz.utc)
-    amsterdam_tz = pytz.timezone('Europe/Amsterdam')
-    now_amsterdam = now_utc.astimezone(amsterdam_tz)
-    yesterday_amsterdam = now_amsterdam - timedelta(days=1)
-    yesterday_epoch = int(yesterday_amsterdam.timestamp())
-    now_epoch = int(now_amsterdam.timestamp())
+    now_local = datetime.now(get_timezone())
+    yesterday_local = now_local - timedelta(days=1)
+    yesterday_epoch = int(yesterday_local.timestamp())
+    now_epoch = int(now_local.timestamp())
 
     return yesterday_epoch, now_epoch
 
@@ -85,22 +120,16 @@ def ordinal(n):
         suffix = 'th'
     return str(n) + suffix
 
-def calculate_time_difference(earliest_date_str: str, latest_date_str: str) -> str:
+def format_duration(total_seconds: int) -> str:
     """
-    A function to calculate the time difference between two dates.
+    A function to format a number of seconds, for example the difference between two epochs.
 
     Args:
-    - earliest_date_str: String representing the earliest date.
-    - latest_date_str: String representing the latest date.
+    - total_seconds: The number of seconds.
 
     Returns:
-    String representing the time difference in a human-readable format.
+    String representing the duration in a human-readable format.
     """
-    format_str = '%Y-%m-%d %H:%M:%S'
-    earliest_date = datetime.strptime(earliest_date_str, format_str)
-    latest_date = datetime.strptime(latest_date_str, format_str)
-    
-    total_seconds = int((latest_date - earliest_date).total_seconds())
     minutes, _ = divmod(total_seconds, 60)
     hours, minutes = divmod(minutes, 60)
     days, hours = divmod(hours, 24)
@@ -115,4 +144,16 @@ def calculate_time_difference(earliest_date_str: str, latest_date_str: str) -> s
     elif time_units:
         return time_units[0]
     else:
-        return '0 minutes'
\ No newline at end of file
+        return '0 minutes'
+
+def api_date_to_epoch(date_str: str) -> int:
+    """
+    A function to convert a RetroAchievements date to epoch time.
+
+    Args:
+    - date_str: String representing the date, in either format accepted by parse_api_date.
+
+    Returns:
+    Integer representing the epoch time.
+    """
+    return int(parse_api_date(date_str).timestamp())
@@ -0,0 +1,89 @@
+import json
+import os
+import time
+
+from utils.achievement import CONSOLE_NAME_MAP
+from utils.custom_logger import logger
+
+DEFAULT_EMOJI = ":video_game:"
+
+class EmojiRegistry:
+    """
+    Console emoji loaded from emoji.json once and kept in memory.
+
+    Emoji strings are built once per console name and console ID, so a lookup is a dict hit.
+    The file's modification time is checked at most every `check_interval` seconds and the
+    registry reloads itself when it changed, so new emoji can be added without a restart.
+
+    Args:
+        path (str): Path to the emoji mapping file.
+        check_interval (float): Minimum number of seconds between modification time checks.
+    """
+    def __init__(self, path: str = 'emoji.json', check_interval: float = 30):
+        self.path = path
+        self.check_interval = check_interval
+        self.mtime = None
+        self.last_check = 0.0
+        self.emoji_ids = {}
+        self.by_name = {}
+        self.by_console_id = {}
+
+    def load(self) -> None:
+        try:
+            mtime = os.stat(self.path).st_mtime
+            with open(self.path) as f:
+                emoji_ids = json.load(f)
+        except FileNotFoundError:
+            logger.error(f'{self.path} not found, using {DEFAULT_EMOJI} for every console')
+            mtime, emoji_ids = None, {}
+        except json.JSONDecodeError as e:
+            logger.error(f'Error reading {self.path}, keeping the previous emoji: {e}')
+            return
+        self.mtime = mtime
+        self.emoji_ids = {name.lower(): emoji_id for name, emoji_id in emoji_ids.items()}
+        self.by_console_id = {}
+        # Precompute every console we know the full name of, the rest is built on first use
+        self.by_name = {}
+        for console_name in CONSOLE_NAME_MAP:
+            self.by_name[console_name] = self.build(console_name)
+        logger.info(f'Loaded {len(self.emoji_ids)} console emoji from {self.path}')
+
+    def build(self, console_name: str) -> str:
+        # Get the emoji ID based on console name, with a general emoji if no specific match is found
+        remapped_name = CONSOLE_NAME_MAP.get(console_name, console_name)
+        emoji_id = self.emoji_ids.get(remapped_name.lower())
+        return f"<:{remapped_name}:{emoji_id}>" if emoji_id else DEFAULT_EMOJI
+
+    def reload_if_changed(self) -> None:
+        now = time.monotonic()
+        if self.last_check and now - self.last_check < self.check_interval:
+            return
+        self.last_check = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self.mtime or not self.by_name:
+            self.load()
+
+    def get(self, console_name: str, console_id=None) -> str:
+        """
+        Returns the Discord emoji for a console.
+
+        Args:
+            console_name (str): The full console name as returned by the API.
+            console_id: The console ID, if known, used as a faster key on later lookups.
+
+        Returns:
+            str: The emoji string, or the general video game emoji when there is none for the console.
+        """
+        self.reload_if_changed()
+        if console_id is not None and (emoji := self.by_console_id.get(console_id)) is not None:
+            return emoji
+        if (emoji := self.by_name.get(console_name)) is None:
+            emoji = self.by_name[console_name] = self.build(console_name)
+        if console_id is not None:
+            self.by_console_id[console_id] = emoji
+        return emoji
+
+emoji_registry = EmojiRegistry()
@@ -0,0 +1,172 @@
+import atexit
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from services.achievement import Achievement
+from utils.custom_logger import logger
+
+class EventStore:
+    """
+    Local history of every unlock the bot has seen, with the metadata of their games.
+
+    Unlocks are recorded as the achievements API responses are parsed, games as their details
+    are fetched. Everything lives in a SQLite database in WAL mode, so the history can be
+    queried while the bot keeps writing to it. Unlocks are indexed on (user, date), game ID and
+    achievement ID, which keeps the queries below in the milliseconds however long the history
+    grows. An unlock is stored once per user, achievement and mode, seeing it again is a no-op.
+
+    Args:
+        path (str): Path to the SQLite database.
+    """
+    def __init__(self, path: str = 'events.db'):
+        self.path = path
+        self.lock = threading.RLock()
+        self.connection = None
+
+    def open(self) -> None:
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS unlocks ('
+                'user TEXT NOT NULL, achievement_id INTEGER NOT NULL, mode TEXT NOT NULL, date TEXT NOT NULL, '
+                'game_id INTEGER NOT NULL, title TEXT, description TEXT, points INTEGER, retropoints INTEGER, '
+                'type TEXT, badge_name TEXT, PRIMARY KEY (user, achievement_id, mode))'
+            )
+            self.connection.execute('CREATE INDEX IF NOT EXISTS unlocks_user_date ON unlocks (user, date)')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS unlocks_game ON unlocks (game_id)')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS unlocks_achievement ON unlocks (achievement_id)')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS games ('
+                'game_id INTEGER PRIMARY KEY, title TEXT, console_id INTEGER, console_name TEXT, image_icon TEXT, '
+                'total_achievements INTEGER, total_points INTEGER, total_players_hardcore INTEGER, updated_at REAL NOT NULL)'
+            )
+        atexit.register(self.close)
+
+    def execute(self, query: str, params: Iterable = ()) -> List[dict]:
+        with self.lock:
+            if self.connection is None:
+                self.open()
+            return [dict(row) for row in self.connection.execute(query, tuple(params))]
+
+    def write(self, query: str, rows: list) -> None:
+        if not rows:
+            return
+        with self.lock:
+            if self.connection is None:
+                self.open()
+            try:
+                with self.connection:  # One transaction for the whole batch
+                    self.connection.executemany(query, rows)
+            except sqlite3.Error as e:
+                logger.error(f'Error writing to {self.path}: {e}')
+
+    def close(self) -> None:
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+    def record_unlocks(self, user: str, achievements: Iterable) -> None:
+        """
+        Stores unlocks from an achievements API response.
+
+        Args:
+            user (str): The user who earned the achievements.
+            achievements (Iterable): The Achievement objects from the response.
+        """
+        self.write(
+            'INSERT OR IGNORE INTO unlocks (user, achievement_id, mode, date, game_id, title, description, points, retropoints, type, badge_name) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [
+                (user, a.achievement_id, a.mode, a.date, a.game_id, a.title, a.description, a.points, a.retropoints, a.type, a.badge_name)
+                for a in achievements if a.achievement_id != "N/A" and a.date != "N/A"
+            ]
+        )
+
+    def record_game(self, game) -> None:
+        """
+        Stores or refreshes the metadata of a game.
+
+        Args:
+            game (Game): The game from a game details API response.
+        """
+        if game.id == "N/A":
+            return
+        self.write(
+            'INSERT OR REPLACE INTO games (game_id, title, console_id, console_name, image_icon, total_achievements, total_points, total_players_hardcore, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [(game.id, game.title, game.console_id, game.console_name, game.image_icon, game.total_achievements, game.total_points, game.total_players_hardcore, time.time())]
+        )
+
+    def unlocks(self, user: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None,
+                game_id: Optional[int] = None, achievement_id: Optional[int] = None, limit: Optional[int] = None) -> List[dict]:
+        """
+        Returns stored unlocks, newest first.
+
+        Args:
+            user (str): Only unlocks of this user.
+            start (str): Only unlocks at or after this date, formatted like the API ('%Y-%m-%d %H:%M:%S', UTC).
+            end (str): Only unlocks before this date.
+            game_id (int): Only unlocks in this game.
+            achievement_id (int): Only unlocks of this achievement.
+            limit (int): The maximum number of unlocks to return.
+
+        Returns:
+            List[dict]: The unlocks, with the title and console of their game when it is known.
+        """
+        filters, params = [], []
+        for column, operator, value in (('u.user', '=', user), ('u.date', '>=', start), ('u.date', '<', end), ('u.game_id', '=', game_id), ('u.achievement_id', '=', achievement_id)):
+            if value is not None:
+                filters.append(f'{column} {operator} ?')
+                params.append(value)
+        query = 'SELECT u.*, g.title AS game_title, g.console_name FROM unlocks u LEFT JOIN games g ON g.game_id = u.game_id'
+        if filters:
+            query += ' WHERE ' + ' AND '.join(filters)
+        query += ' ORDER BY u.date DESC'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return self.execute(query, params)
+
+    def history(self, user: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Tuple[int, Achievement]]:
+        """
+        Returns a user's stored unlocks as (epoch, Achievement) pairs, oldest first, ready for
+        `utils.aggregate.aggregate` or `utils.aggregate.rollup`.
+        """
+        achievements = [
+            Achievement({
+                'AchievementID': row['achievement_id'], 'Title': row['title'], 'Description': row['description'],
+                'Points': row['points'], 'TrueRatio': row['retropoints'], 'Date': row['date'],
+                'HardcoreMode': 1 if row['mode'] == 'Hardcore' else 0, 'Type': row['type'], 'BadgeName': row['badge_name'],
+                'BadgeURL': f"/Badge/{row['badge_name']}.png", 'GameID': row['game_id'], 'GameTitle': row['game_title'],
+                'GameURL': f"/game/{row['game_id']}", 'ConsoleName': row['console_name'],
+            })
+            for row in reversed(self.unlocks(user=user, start=start, end=end))
+        ]
+        return [(int(achievement.timestamp.timestamp()), achievement) for achievement in achievements]
+
+    def points_by_user(self, start: Optional[str] = None, end: Optional[str] = None) -> List[dict]:
+        """
+        Returns a leaderboard of the points every user earned in a period, highest first.
+
+        Hardcore and softcore points are counted separately, RetroPoints only exist for hardcore unlocks.
+        """
+        return self.execute(
+            "SELECT user, COUNT(*) AS achievements, "
+            "SUM(CASE WHEN mode = 'Hardcore' THEN points ELSE 0 END) AS hardcore_points, "
+            "SUM(CASE WHEN mode = 'Softcore' THEN points ELSE 0 END) AS softcore_points, "
+            "SUM(CASE WHEN mode = 'Hardcore' THEN retropoints ELSE 0 END) AS retropoints "
+            "FROM unlocks WHERE date >= ? AND date < ? GROUP BY user ORDER BY hardcore_points DESC, user",
+            (start or '', end or '9999')
+        )
+
+    def game(self, game_id: int) -> Optional[dict]:
+        rows = self.execute('SELECT * FROM games WHERE game_id = ?', (game_id,))
+        return rows[0] if rows else None
+
+event_store = EventStore()
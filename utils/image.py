@@ -1,88 +1,199 @@
 from PIL import Image
+import asyncio
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 import numpy as np
-import os
-import json
-from sklearn.cluster import KMeans
 
-def cache_color(image_url, cache_file='image_cache.json', num_clusters=3):
+from config.config import COLOR_CACHE_MAX_ENTRIES, COLOR_ENGINE, COLOR_WORKERS, COLOR_DEADLINE
+from utils.color_cache import ColorCache
+from utils.custom_logger import logger
+
+DEFAULT_COLOR = 0  # Discord's default embed color
+
+color_cache = ColorCache(max_entries=COLOR_CACHE_MAX_ENTRIES)
+# Threads rather than processes, so every worker shares the in-memory color cache
+color_executor = ThreadPoolExecutor(max_workers=COLOR_WORKERS, thread_name_prefix='color')
+color_jobs = {}  # Image URL to the extraction that is in flight for it
+
+def image_pixels(image_bytes):
     """
-    Cache the most vibrant and colorful area of the image to avoid recalculating it.
+    Decode an image into the array of pixels used for color extraction.
 
     Args:
-        image_url (str): The URL of the image to cache.
-        cache_file (str): Path to the JSON file used to store the cached color.
-        num_clusters (int): Number of color clusters to detect.
+        image_bytes (bytes): The raw image data.
 
     Returns:
-        int: The most vibrant and colorful color in hexadecimal format.
+        np.ndarray: The pixels as an (n, 3) array, with very dark pixels removed.
     """
-    # Check if the cache file exists
-    if os.path.exists(cache_file):
-        with open(cache_file, 'r') as f:
-            cached_data = json.load(f)
-            if image_url in cached_data:
-                # If the color is already cached, return it
-                return cached_data[image_url]
-
-    # If color not cached, fetch and calculate it
-    response = requests.get(image_url)
-    img = Image.open(BytesIO(response.content))
+    img = Image.open(BytesIO(image_bytes))
     img = img.convert("RGB")  # Ensure the image is in RGB format
 
     # Resize the image for faster processing
-    img = img.resize((img.width // 2, img.height // 2))
-
-    # Convert the image to a NumPy array
-    img_data = np.array(img)
+    img = img.resize((max(1, img.width // 2), max(1, img.height // 2)))
 
-    # Reshape the image data into a 2D array of pixels for clustering
-    pixels = img_data.reshape((-1, 3))
+    # Reshape the image data into a 2D array of pixels
+    pixels = np.asarray(img).reshape((-1, 3))
 
-    # Remove colors that are too close to black/gray/white
+    # Remove colors that are too close to black
     mask = np.linalg.norm(pixels, axis=1) > 50  # A simple threshold to remove very dark colors
-    filtered_pixels = pixels[mask]
+    return pixels[mask] if mask.any() else pixels  # Keep a fully dark image instead of returning nothing
 
-    # Perform KMeans clustering to find color clusters
-    kmeans = KMeans(n_clusters=num_clusters, random_state=0)
-    kmeans.fit(filtered_pixels)
+def most_vibrant(colors):
+    # The most vibrant color is the one that is farthest from black
+    return colors[np.argmax(np.linalg.norm(colors, axis=1))]
+
+def histogram_color(pixels, num_clusters=3, levels=4):
+    """
+    Find the most vibrant dominant color with a NumPy color histogram.
 
-    # Get the centers of the clusters (the most common colors)
-    cluster_centers = kmeans.cluster_centers_
+    Every pixel is binned into a levels x levels x levels RGB grid. The `num_clusters` most
+    populated bins stand in for the KMeans clusters, the mean color of each bin is its center.
 
-    # Calculate the distance from each cluster center to the black/white axis (i.e., evaluate vibrancy)
-    distances = np.linalg.norm(cluster_centers - np.array([0, 0, 0]), axis=1)
+    Args:
+        pixels (np.ndarray): The pixels as an (n, 3) array.
+        num_clusters (int): Number of dominant colors to choose from.
+        levels (int): Number of bins per color channel.
+
+    Returns:
+        np.ndarray: The most vibrant dominant color as RGB.
+    """
+    pixels = pixels.astype(np.int64)
+    quantized = pixels * levels // 256
+    bins = (quantized[:, 0] * levels + quantized[:, 1]) * levels + quantized[:, 2]
+    counts = np.bincount(bins, minlength=levels ** 3)
+    top_bins = np.argsort(counts)[::-1][:num_clusters]
+    top_bins = top_bins[counts[top_bins] > 0]
+    sums = np.stack([np.bincount(bins, weights=pixels[:, channel], minlength=levels ** 3) for channel in range(3)], axis=1)
+    centers = sums[top_bins] / counts[top_bins, None]
+    return most_vibrant(centers)
+
+def kmeans_color(pixels, num_clusters=3):
+    """
+    Find the most vibrant dominant color with KMeans clustering (scikit-learn).
+
+    Args:
+        pixels (np.ndarray): The pixels as an (n, 3) array.
+        num_clusters (int): Number of color clusters to detect.
+
+    Returns:
+        np.ndarray: The most vibrant cluster center as RGB.
+    """
+    from sklearn.cluster import KMeans  # Imported on first use, scikit-learn is slow to import
+
+    kmeans = KMeans(n_clusters=min(num_clusters, len(np.unique(pixels, axis=0))), random_state=0)
+    kmeans.fit(pixels)
+    return most_vibrant(kmeans.cluster_centers_)
+
+COLOR_ENGINES = {
+    'histogram': histogram_color,
+    'kmeans': kmeans_color,
+}
+
+def extract_color(image_bytes, num_clusters=3, engine=COLOR_ENGINE):
+    """
+    Find the most vibrant and colorful area of an image.
+
+    Args:
+        image_bytes (bytes): The raw image data.
+        num_clusters (int): Number of color clusters to detect.
+        engine (str): The color extraction engine, 'histogram' or 'kmeans'.
 
-    # Get the most vibrant cluster (the one that is farthest from black)
-    most_vibrant_cluster_idx = np.argmax(distances)
-    vibrant_color = cluster_centers[most_vibrant_cluster_idx]
+    Returns:
+        int: The most vibrant and colorful color in hexadecimal format.
+    """
+    if engine not in COLOR_ENGINES:
+        raise ValueError("Invalid COLOR_ENGINE configuration value")
+    vibrant_color = COLOR_ENGINES[engine](image_pixels(image_bytes), num_clusters)
 
     # Convert the RGB color to hexadecimal format
-    vibrant_color_hex = int('0x{:02x}{:02x}{:02x}'.format(*vibrant_color.astype(int)), 16)
+    return int('0x{:02x}{:02x}{:02x}'.format(*np.clip(vibrant_color, 0, 255).astype(int)), 16)
 
-    # Cache the color
-    if not os.path.exists(cache_file):
-        cached_data = {}
+def cache_color(image_url, num_clusters=3):
+    """
+    Cache the most vibrant and colorful area of the image to avoid recalculating it.
 
-    cached_data[image_url] = vibrant_color_hex
+    Args:
+        image_url (str): The URL of the image to cache.
+        num_clusters (int): Number of color clusters to detect.
+
+    Returns:
+        int: The most vibrant and colorful color in hexadecimal format.
+    """
+    # If the color is already cached, return it
+    if (cached_color := color_cache.get(image_url)) is not None:
+        return cached_color
+
+    # If color not cached, fetch and calculate it
+    response = requests.get(image_url, timeout=10)
+    response.raise_for_status()
+    vibrant_color_hex = extract_color(response.content, num_clusters)
 
-    # Save the color to the cache file
-    with open(cache_file, 'w') as f:
-        json.dump(cached_data, f)
+    # Cache the color, it is written to disk in batches
+    color_cache.set(image_url, vibrant_color_hex)
 
     return vibrant_color_hex
 
-def get_discord_color(image_url, cache_file='image_cache.json', num_clusters=3):
+def color_job(image_url, num_clusters=3):
+    """
+    Get the extraction job for an image, starting it in the worker pool if none is in flight.
+
+    Args:
+        image_url (str): The URL of the image to analyze.
+        num_clusters (int): Number of color clusters to detect.
+
+    Returns:
+        asyncio.Future: The running extraction.
+    """
+    if (job := color_jobs.get(image_url)) is None:
+        job = asyncio.get_running_loop().run_in_executor(color_executor, cache_color, image_url, num_clusters)
+        color_jobs[image_url] = job
+        job.add_done_callback(lambda _: color_jobs.pop(image_url, None))
+        # Nobody may be waiting anymore when a job fails after its deadline, retrieve the exception so it is not reported as unhandled
+        job.add_done_callback(lambda done: done.cancelled() or done.exception())
+    return job
+
+async def get_discord_color(image_url, num_clusters=3, deadline=COLOR_DEADLINE):
     """
     Get the most vibrant and colorful color (Discord color) from the image for caching.
 
+    Downloading and analyzing the image runs in a worker thread, so it never blocks the event
+    loop. Requests for an image that is already being analyzed share the same job. When the
+    job fails or takes longer than `deadline` seconds the default color is returned, the job
+    keeps running and caches its color for the next embed.
+
     Args:
         image_url (str): The URL of the image to analyze.
-        cache_file (str): Path to the JSON file used to store cached color.
         num_clusters (int): Number of color clusters to detect.
+        deadline (float): Number of seconds to wait for the color.
 
     Returns:
         int: The most vibrant and colorful color in hexadecimal format.
     """
-    return cache_color(image_url, cache_file, num_clusters)
\ No newline at end of file
+    if (cached_color := color_cache.get(image_url)) is not None:
+        return cached_color
+    try:
+        return await asyncio.wait_for(asyncio.shield(color_job(image_url, num_clusters)), deadline)
+    except asyncio.TimeoutError:
+        logger.warning(f'Color for {image_url} took longer than {deadline} seconds, using the default color')
+    except Exception as e:
+        logger.error(f'Error getting color for {image_url}: {e}')
+    return DEFAULT_COLOR
+
+def prewarm_game_colors(game):
+    """
+    Start the color extraction of a game's icon as soon as its details are fetched.
+
+    Achievement and mastery embeds take their color from the game icon, so the extraction
+    runs while the rest of the cycle is still waiting on the API and the embed joins the
+    running job or finds the color cached. Badge colors are not prewarmed, only the daily
+    overview reads one and it cannot be known in advance which.
+
+    Args:
+        game (Game): The game whose icon color should be cached.
+    """
+    url = game.image_icon
+    if url in color_cache or url in color_jobs:
+        return
+    logger.debug(f'Prewarming the icon color of {game.title}')
+    color_job(url)
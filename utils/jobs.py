@@ -0,0 +1,168 @@
+import asyncio
+import functools
+import time
+from typing import Awaitable, Callable, Optional
+
+from config.config import TASK_BUDGET
+from services.api import rate_limiter, circuit_breaker
+from utils.custom_logger import logger
+
+WAIT_STEP = 1  # Seconds between capacity checks of a deferred job
+TICK_TOLERANCE = 0.1  # Fraction of the interval a tick may arrive early and still count as due
+
+class Job:
+    """
+    The schedule and statistics of one recurring task.
+    """
+    def __init__(self, name: str, interval: float, budget: Optional[float], priority: int):
+        self.name = name
+        self.interval = interval
+        self.budget = budget
+        self.priority = priority
+        self.running = False
+        self.pending = False
+        self.next_due = 0.0
+        self.runs = 0
+        self.overruns = 0
+        self.timeouts = 0
+        self.merged = 0
+        self.skipped = 0
+        self.last_started = None
+        self.last_duration = None
+        self.max_duration = 0.0
+
+    def stats(self) -> dict:
+        return {
+            'runs': self.runs, 'overruns': self.overruns, 'timeouts': self.timeouts, 'merged': self.merged,
+            'skipped': self.skipped, 'last_duration': self.last_duration, 'max_duration': self.max_duration,
+        }
+
+class JobRunner:
+    """
+    Runs the recurring tasks of the bot without overlap, within a time budget and by priority.
+
+    discord.py schedules a relative `tasks.loop` from the previous tick, so after a cycle that
+    ran longer than its interval the loop fires every tick it missed back to back. The runner
+    keeps its own schedule per job: the first late tick runs as a single catch-up cycle and the
+    ticks that were missed during the overrun are merged into it. A tick that arrives while the
+    job is still running never starts a second run, it marks the job pending and the running
+    cycle is followed by one catch-up run.
+
+    Every run is cancelled once it exceeds its budget. Jobs with a lower priority wait while a
+    job with a higher priority is running, the RetroAchievements API is paused or its rate
+    limiter has no requests left, so achievement polling always gets the API first. A deferred
+    job waits only as long as it can still finish before its next tick, otherwise the tick is
+    skipped.
+
+    Args:
+        budgets (dict): The maximum number of seconds per run of each job, missing jobs are not limited.
+    """
+    def __init__(self, budgets: dict):
+        self.budgets = budgets
+        self.jobs = {}
+
+    def job(self, name: str, interval: float, priority: int = 0) -> Callable:
+        """
+        Decorator that runs a task body through the runner, place it under `tasks.loop`.
+
+        Args:
+            name (str): The name of the job, also its key in the budgets.
+            interval (float): The number of seconds between ticks of the loop.
+            priority (int): Jobs with a higher priority get the API first.
+        """
+        self.jobs[name] = Job(name, interval, self.budgets.get(name), priority)
+
+        def decorator(func: Callable[..., Awaitable]) -> Callable[..., Awaitable]:
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                await self.run(name, lambda: func(*args, **kwargs))
+            return wrapper
+        return decorator
+
+    def blocked(self, job: Job) -> Optional[str]:
+        """
+        Returns why a job has to wait for API capacity, or None if it can run.
+        The jobs with the highest priority never wait, the API client throttles them itself.
+        """
+        higher = [other for other in self.jobs.values() if other.priority > job.priority]
+        if not higher:
+            return None
+        for other in higher:
+            if other.running:
+                return f'{other.name} is running'
+        if circuit_breaker.is_open():
+            return 'the RetroAchievements API is paused'
+        if rate_limiter.available() < 1:
+            return 'the RetroAchievements API rate limit is used up'
+        return None
+
+    async def wait_for_capacity(self, job: Job, deadline: float) -> bool:
+        while True:
+            reason = self.blocked(job)
+            if reason is None:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.warning(f'Skipping {job.name}, {reason}')
+                return False
+            logger.debug(f'Deferring {job.name}, {reason}')
+            await asyncio.sleep(min(WAIT_STEP, remaining))
+
+    async def run(self, name: str, func: Callable[[], Awaitable]) -> None:
+        """
+        Runs one tick of a job.
+
+        Args:
+            name (str): The name the job was registered with.
+            func (Callable): Returns the coroutine of a single run.
+        """
+        job = self.jobs[name]
+        if job.running:
+            job.pending = True
+            job.merged += 1
+            logger.warning(f'{name} is still running, merging this tick into one catch-up run')
+            return
+        now = time.monotonic()
+        if now < job.next_due - job.interval * TICK_TOLERANCE:
+            job.merged += 1  # A tick the loop missed during an overrun, the catch-up run already covered it
+            return
+        job.running = True
+        try:
+            while True:
+                job.pending = False
+                # Wait as long as the run can still finish before the next tick, the whole interval without a budget
+                if not await self.wait_for_capacity(job, time.monotonic() + job.interval - (job.budget or 0)):
+                    job.skipped += 1
+                    break
+                await self.execute(job, func)
+                if not job.pending:
+                    break
+                logger.info(f'Running {name} again to catch up on the ticks it missed')
+        finally:
+            job.running = False
+
+    async def execute(self, job: Job, func: Callable[[], Awaitable]) -> None:
+        started = time.monotonic()
+        job.last_started = time.time()
+        job.next_due = started + job.interval
+        try:
+            await asyncio.wait_for(func(), job.budget)
+        except asyncio.TimeoutError:
+            job.timeouts += 1
+            logger.error(f'{job.name} was cancelled after exceeding its budget of {job.budget} seconds')
+        except Exception as e:
+            logger.error(f'Error running {job.name}: {e}')
+        duration = time.monotonic() - started
+        job.runs += 1
+        job.last_duration = duration
+        job.max_duration = max(job.max_duration, duration)
+        if duration > job.interval:
+            job.overruns += 1
+            logger.warning(f'{job.name} took {duration:.1f} seconds, longer than its interval of {job.interval} seconds, {int(duration // job.interval)} ticks will be merged into one catch-up run')
+        else:
+            logger.debug(f'{job.name} took {duration:.1f} seconds')
+
+    def stats(self) -> dict:
+        return {name: job.stats() for name, job in self.jobs.items()}
+
+job_runner = JobRunner(TASK_BUDGET)
@@ -0,0 +1,30 @@
+class lazy:
+    """
+    A cached property for classes with __slots__.
+
+    The value is computed on first access and stored in the slot named after the property with
+    a leading underscore, which the class has to declare in its __slots__. Later accesses are a
+    plain slot read. functools.cached_property cannot be used here, it needs an instance __dict__.
+
+    Example:
+        class Achievement:
+            __slots__ = ('date', '_date_amsterdam')
+
+            @lazy
+            def date_amsterdam(self):
+                return format_date(self.date)
+    """
+    def __init__(self, func):
+        self.func = func
+        self.slot = f"_{func.__name__}"
+        self.__doc__ = func.__doc__
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        try:
+            return getattr(instance, self.slot)
+        except AttributeError:
+            value = self.func(instance)
+            setattr(instance, self.slot, value)
+            return value
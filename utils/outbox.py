@@ -0,0 +1,142 @@
+import json
+import os
+from typing import Iterable
+
+import discord
+
+from utils.datetime import parse_api_date
+from utils.custom_logger import logger
+
+class Outbox:
+    """
+    Durable queue of embeds that have been built but not yet accepted by Discord.
+
+    Every embed is stored under a key (the user plus the achievement or mastery ID) in an
+    append-only JSON lines file: an 'add' record when it is queued and a 'done' record once it
+    has been sent. Records are buffered and written with a single fsync per `flush`, so a poll
+    cycle costs one or two syncs however many embeds it produced. Embeds that are still pending
+    when the bot starts are loaded from the file and sent again, the file is compacted whenever
+    nothing is pending anymore.
+
+    Every time Discord rejects an embed a 'fail' record is added. After `max_attempts` rejections
+    the embed is given up on: it is moved to a dead letter file and no longer sent.
+
+    Args:
+        path (str): Path to the JSON lines file the outbox is stored in.
+        max_attempts (int): Number of rejections after which an embed is dead-lettered.
+    """
+    def __init__(self, path: str = 'outbox.jsonl', max_attempts: int = 3):
+        self.path = path
+        self.dead_letter_path = f'{os.path.splitext(path)[0]}.dead.jsonl'
+        self.max_attempts = max_attempts
+        self.entries = {}  # Key to the pending record, in the order they were added
+        self.buffer = []
+        self.dead_letters = []
+        self.lines = 0
+        self.load()
+
+    def load(self) -> None:
+        self.entries = {}
+        self.lines = 0
+        try:
+            with open(self.path, 'r') as f:
+                for line in f:
+                    self.lines += 1
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f'Skipping a damaged line in {self.path}')  # Most likely the last line of a crashed write
+                        continue
+                    if record['op'] == 'add':
+                        self.entries.setdefault(record['key'], record)
+                    elif record['op'] == 'fail':
+                        if record['key'] in self.entries:
+                            self.entries[record['key']]['attempts'] = self.entries[record['key']].get('attempts', 0) + 1
+                    else:
+                        self.entries.pop(record['key'], None)
+        except FileNotFoundError:
+            return
+        if self.entries:
+            logger.info(f'Loaded {len(self.entries)} unsent embeds from {self.path}')
+        if self.lines > len(self.entries):
+            self.compact()  # Drops sent embeds and a damaged last line, which new records would otherwise be appended to
+
+    def compact(self) -> None:
+        # Write to a temporary file first so a crash never leaves a half-written outbox
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w') as f:
+            f.writelines(json.dumps(record) + '\n' for record in self.entries.values())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self.lines = len(self.entries)
+
+    def add(self, channel: str, embeds: Iterable) -> None:
+        """
+        Queues embeds for a channel.
+
+        Args:
+            channel (str): The name of the channel the embeds are for, 'achievements' or 'mastery'.
+            embeds (Iterable): (date, embed, key) tuples, embeds whose key is already pending are skipped.
+        """
+        for date, embed, key in embeds:
+            if key in self.entries:
+                continue
+            record = {'op': 'add', 'key': key, 'channel': channel, 'date': date.isoformat(), 'embed': embed.to_dict()}
+            self.entries[key] = record
+            self.buffer.append(record)
+
+    def pending(self, channel: str) -> list:
+        """
+        Returns the pending (date, embed, key) tuples for a channel.
+        """
+        return [
+            (parse_api_date(record['date']), discord.Embed.from_dict(record['embed']), key)
+            for key, record in self.entries.items() if record['channel'] == channel
+        ]
+
+    def mark_done(self, keys: Iterable) -> None:
+        for key in keys:
+            if self.entries.pop(key, None) is not None:
+                self.buffer.append({'op': 'done', 'key': key})
+
+    def mark_failed(self, key: str, error: Exception) -> None:
+        """
+        Records that Discord rejected an embed, dead-letters it after `max_attempts` rejections.
+        """
+        record = self.entries.get(key)
+        if record is None:
+            return
+        record['attempts'] = record.get('attempts', 0) + 1
+        if record['attempts'] < self.max_attempts:
+            logger.warning(f"Discord rejected embed {key} ({record['attempts']}/{self.max_attempts}), it is retried next cycle: {error}")
+            self.buffer.append({'op': 'fail', 'key': key})
+            return
+        logger.error(f"Discord rejected embed {key} {record['attempts']} times, moving it to {self.dead_letter_path}: {error}")
+        self.dead_letters.append({**record, 'error': str(error)})
+        del self.entries[key]
+        self.buffer.append({'op': 'done', 'key': key})
+
+    def flush(self) -> None:
+        if self.dead_letters:
+            with open(self.dead_letter_path, 'a') as f:
+                f.writelines(json.dumps(record) + '\n' for record in self.dead_letters)
+                f.flush()
+                os.fsync(f.fileno())
+            self.dead_letters.clear()
+        if not self.buffer:
+            return
+        if not self.entries:
+            # Nothing is pending, start over with an empty file instead of growing it forever
+            self.buffer.clear()
+            if self.lines:
+                with open(self.path, 'w') as f:
+                    os.fsync(f.fileno())
+                self.lines = 0
+            return
+        with open(self.path, 'a') as f:
+            f.writelines(json.dumps(record) + '\n' for record in self.buffer)
+            f.flush()
+            os.fsync(f.fileno())
+        self.lines += len(self.buffer)
+        self.buffer.clear()
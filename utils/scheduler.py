@@ -0,0 +1,95 @@
+import time
+import zlib
+from typing import List, Optional
+
+from config.config import users, RETROACHIEVEMENTS_INTERVAL, POLL_MAX_INTERVAL, POLL_BACKOFF, POLL_PROBE_INTERVAL
+from utils.custom_logger import logger
+
+class PollScheduler:
+    """
+    Gives every tracked user their own achievements poll interval.
+
+    Active users are polled every `min_interval` minutes. Every poll that finds no activity
+    multiplies the user's interval by `backoff`, up to `max_interval`. A user counts as active
+    when new unlocks are found or their profile shows a different rich presence or last game.
+    Every user gets a fixed offset within the interval, so polls are spread out instead of
+    all users being polled on the same tick. Idle users whose interval has grown past
+    `probe_interval` get their profile checked every `probe_interval` minutes in between, so
+    a user who starts playing is back on the minimum interval without waiting for their next
+    backed-off poll.
+
+    Args:
+        users (list): The usernames to schedule.
+        min_interval (int): The poll interval in minutes for active users.
+        max_interval (int): The poll interval in minutes for users that have been idle for a while.
+        backoff (float): The factor the interval grows by after every idle poll.
+        probe_interval (int): The number of minutes between profile checks of idle users.
+    """
+    def __init__(self, users: List[str], min_interval: int, max_interval: int, backoff: float, probe_interval: int):
+        self.min_interval = min_interval * 60
+        self.max_interval = max(max_interval, min_interval) * 60
+        self.backoff = backoff
+        self.probe_interval = max(probe_interval, min_interval) * 60
+        now = time.time()
+        self.state = {
+            user: {'interval': self.min_interval, 'next_due': now + self.phase(user), 'next_probe': 0.0, 'rich_presence': None, 'last_game_id': None}
+            for user in users
+        }
+
+    def phase(self, user: str) -> float:
+        # crc32 is stable across restarts, unlike hash()
+        return zlib.crc32(user.encode()) % self.min_interval
+
+    def due_users(self, now: Optional[float] = None) -> List[str]:
+        now = now or time.time()
+        return [user for user, state in self.state.items() if state['next_due'] <= now]
+
+    def due_probes(self, now: Optional[float] = None) -> List[str]:
+        """
+        Returns the idle users whose profile should be checked for activity before their next poll.
+        """
+        now = now or time.time()
+        return [
+            user for user, state in self.state.items()
+            if state['interval'] > self.probe_interval and state['next_probe'] <= now and state['next_due'] > now + self.probe_interval
+        ]
+
+    def record_poll(self, user: str, active: Optional[bool]) -> None:
+        """
+        Schedules the next poll for a user after they have been polled.
+
+        Args:
+            user (str): The user that was polled.
+            active (Optional[bool]): Whether activity was found, None if the poll failed.
+        """
+        state = self.state[user]
+        if active:
+            state['interval'] = self.min_interval
+        elif active is not None:
+            state['interval'] = min(self.max_interval, state['interval'] * self.backoff)
+        state['next_due'] = max(state['next_due'] + state['interval'], time.time() + state['interval'] / 2)
+        logger.debug(f"Next achievements poll for {user} in {int(state['next_due'] - time.time())} seconds")
+
+    def observe_profile(self, user: str, profile) -> bool:
+        """
+        Compares a freshly fetched profile with the last one seen for the user.
+        A changed rich presence or last game makes the user active and due within the minimum interval.
+
+        Returns:
+            bool: True if the profile shows activity.
+        """
+        state = self.state.get(user)
+        if state is None:
+            return False
+        state['next_probe'] = time.time() + self.probe_interval  # Every profile that is seen counts as a probe
+        previous = (state['rich_presence'], state['last_game_id'])
+        state['rich_presence'], state['last_game_id'] = profile.rich_presence_msg, profile.last_game_id
+        if previous == (None, None) or previous == (state['rich_presence'], state['last_game_id']):
+            return False
+        if state['interval'] > self.min_interval:
+            logger.info(f"{user} is active again, polling every {self.min_interval // 60} minutes")
+        state['interval'] = self.min_interval
+        state['next_due'] = min(state['next_due'], time.time() + self.min_interval)
+        return True
+
+poll_scheduler = PollScheduler(users, RETROACHIEVEMENTS_INTERVAL, POLL_MAX_INTERVAL, POLL_BACKOFF, POLL_PROBE_INTERVAL)